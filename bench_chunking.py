@@ -0,0 +1,106 @@
+import argparse
+import os
+import random
+import time
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from chunk_utils import split_spans
+from preprocessing import clean_text
+from utils import read_from_file
+
+
+# ---- Config ----
+folder_path = "data"
+_WORDS = ("Harry", "Potter", "Hogwarts", "wand", "Dumbledore", "the", "of", "and", "was", "a",
+          "Gryffindor", "castle", "spell", "Hermione", "Ron", "to", "in", "his", "Quidditch", "notes")
+
+
+# --------------------------
+# Load Benchmark Corpus
+# --------------------------
+def load_corpus(folder_path, synthetic_docs = 30, synthetic_chars = 40000):
+    """
+    Loads the raw scraped pages, or generates a synthetic corpus of the same shape
+    (long single-line pages with footnote markers) when no data folder is available.
+
+    Args:
+        folder_path (str): Path to the folder containing scraped .txt files.
+        synthetic_docs (int): Number of synthetic documents to generate as a fallback.
+        synthetic_chars (int): Approximate length of each synthetic document.
+
+    Returns:
+        list of str: Raw document texts.
+    """
+    if os.path.isdir(folder_path):
+        docs = [read_from_file(os.path.join(folder_path, f)) for f in sorted(os.listdir(folder_path)) if f.endswith(".txt")]
+        docs = [d for d in docs if d]
+        if docs:
+            return docs
+
+    rng = random.Random(0)
+    docs = []
+    for _ in range(synthetic_docs):
+        words = []
+        length = 0
+        while length < synthetic_chars:
+            word = rng.choice(_WORDS)
+            if rng.random() < 0.08:
+                word += "."
+            if rng.random() < 0.01:
+                word += f"[{rng.randint(1, 99)}]"
+            words.append(word)
+            length += len(word) + 1
+        docs.append(" ".join(words))
+    return docs
+
+
+# --------------------------
+# Current LangChain Path
+# --------------------------
+def chunk_langchain(docs, chunk_size = 100, chunk_overlap = 50):
+    """
+    Splits raw text with LangChain, then cleans every chunk separately (the previous chunker).
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size = chunk_size, chunk_overlap = chunk_overlap)
+    return [clean_text(chunk) for doc in docs for chunk in splitter.split_text(doc)]
+
+
+# --------------------------
+# Single-Pass Span Path
+# --------------------------
+def chunk_spans(docs, chunk_size = 100, chunk_overlap = 50):
+    """
+    Cleans every document once, then splits it into (doc_id, start, end) spans.
+    """
+    spans = []
+    for doc_id, doc in enumerate(docs):
+        text = clean_text(doc)
+        spans.extend((doc_id, start, end) for start, end in split_spans(text, chunk_size, chunk_overlap))
+    return spans
+
+
+# --------------------------
+# Time a Chunker
+# --------------------------
+def bench(name, fn, docs, repeat):
+    """
+    Runs a chunker `repeat` times and prints the best chunks/sec.
+    """
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(fn(docs))
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<12} {count:>8} chunks  {best * 1000:>9.1f} ms  {count / best:>12,.0f} chunks/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark the chunking paths.")
+    parser.add_argument("--data", default = folder_path)
+    parser.add_argument("--repeat", type = int, default = 5)
+    args = parser.parse_args()
+
+    docs = load_corpus(args.data)
+    print(f"Corpus: {len(docs)} documents, {sum(len(d) for d in docs):,} characters")
+    bench("langchain", chunk_langchain, docs, args.repeat)
+    bench("spans", chunk_spans, docs, args.repeat)
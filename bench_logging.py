@@ -0,0 +1,122 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+# ---- Config ----
+query = "What happens in Chapter 1 of Harry Potter and the Philosopher's Stone?"
+shape = (1, 768)
+
+
+class IndexFlatL2:
+    d = 768
+
+
+# --------------------------
+# Per-Query Logging, Before
+# --------------------------
+def log_query_before(index, chunks):
+    """
+    The lines a query used to log: eager f-strings on the root logger, written to the
+    file and the console by the request thread.
+    """
+    logging.info(f"Running semantic search for: '{query}'")
+    logging.info(f"Index type: {type(index)}, Model: {type(index)}, Chunks: {len(chunks)}")
+    logging.info(f"Query embedding shape: {shape}")
+    logging.info(f"Index dimension: {index.d}")
+    logging.info(f"Search for query '{query}' returned {5} results")
+    logging.info(f"Retrieved {5} relevant context chunks.")
+
+
+# --------------------------
+# Per-Query Logging, After
+# --------------------------
+def log_query_after(index, chunks):
+    """
+    The lines a query logs now: lazy debug lines and one sampled line on the query logger,
+    handed to the listener thread.
+    """
+    from log_config import query_logger
+    logger = logging.getLogger("vector_db")
+    logger.debug("Searching %s over %d chunks (d=%d) with query vector %s, model %s",
+                 type(index).__name__, len(chunks), index.d, shape, type(index).__name__)
+    query_logger.info("Search for query %r returned %d results", query, 5)
+    logger.debug("Retrieved %d relevant context chunks.", 5)
+
+
+# --------------------------
+# Time One Configuration
+# --------------------------
+def run(mode, queries, threads, log_path):
+    """
+    Configures logging the old or the new way and times the per-query logging calls
+    in the request threads. Console output goes to /dev/null so the terminal isn't measured.
+
+    Returns:
+        tuple: (mean microseconds, p99 microseconds) per query.
+    """
+    devnull = open(os.devnull, "w")
+    sys.stderr = devnull
+    if mode == "before":
+        logging.basicConfig(
+            level = logging.INFO,
+            format="%(asctime)s [%(levelname)s] %(message)s",
+            handlers=[
+                logging.FileHandler(log_path),
+                logging.StreamHandler(devnull)]
+        )
+        log_query = log_query_before
+    else:
+        from log_config import setup_logging
+        setup_logging(file_path = log_path)
+        log_query = log_query_after
+
+    index, chunks = IndexFlatL2(), [None] * 20000
+    per_thread = queries // threads
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            log_query(index, chunks)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target = worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    latencies.sort()
+    return sum(latencies) / len(latencies) * 1e6, latencies[int(len(latencies) * 0.99)] * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark per-query logging overhead.")
+    parser.add_argument("--queries", type = int, default = 20000)
+    parser.add_argument("--threads", type = int, default = 8)
+    parser.add_argument("--mode", choices = ["before", "after"], help = "Run a single configuration")
+    args = parser.parse_args()
+
+    if args.mode:
+        with tempfile.TemporaryDirectory() as tmp:
+            mean, p99 = run(args.mode, args.queries, args.threads, os.path.join(tmp, "bench.log"))
+        print(f"{mean:.2f} {p99:.2f}")
+        sys.exit(0)
+
+    # Each configuration runs in its own process, since logging can only be configured once
+    print(f"{args.queries} queries on {args.threads} threads")
+    for mode in ("before", "after"):
+        out = subprocess.run([sys.executable, __file__, "--mode", mode, "--queries", str(args.queries),
+                              "--threads", str(args.threads)], capture_output = True, text = True, check = True)
+        mean, p99 = map(float, out.stdout.split())
+        print(f"{mode:<8} {mean:>9.2f} us/query mean  {p99:>9.2f} us/query p99")
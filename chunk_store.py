@@ -0,0 +1,347 @@
+import json
+import logging
+import os
+import numpy as np
+from log_config import setup_logging
+
+
+# ---- Config ----
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+# --------------------------
+# Span-Based Chunk Storage
+# --------------------------
+class ChunkStore:
+    """
+    Stores every cleaned document once and each chunk as a (doc_id, start, end) span
+    into it, held in int32 numpy columns. Chunk text is sliced on demand, so indexing
+    the store behaves like the old list of chunk strings.
+
+    Source metadata is kept per document (URL, page title) and per chunk as an index
+    into a shared table of section headings, which is what `filter_ids` searches.
+
+    Each chunk also carries the ids of the chunks before and after it in its document
+    (-1 at the document edges), so `expand` can widen a hit to its neighbours without
+    re-chunking or re-embedding.
+
+    Args:
+        doc_names (list of str): Source file name of each document.
+        doc_texts (list of str): Cleaned text of each document.
+        doc_ids (np.ndarray): Document of each chunk.
+        starts (np.ndarray): Start offset of each chunk in its document.
+        ends (np.ndarray): End offset of each chunk in its document.
+        doc_urls (list of str): Source URL of each document.
+        doc_titles (list of str): Page title of each document.
+        section_names (list of str): Table of section headings.
+        section_ids (np.ndarray): Section of each chunk (index into section_names, -1 for none).
+        prev_ids (np.ndarray): Previous chunk in the same document, or -1; computed if None.
+        next_ids (np.ndarray): Next chunk in the same document, or -1; computed if None.
+    """
+
+    def __init__(self, doc_names, doc_texts, doc_ids, starts, ends,
+                 doc_urls = None, doc_titles = None, section_names = None, section_ids = None,
+                 prev_ids = None, next_ids = None):
+        self.doc_names = list(doc_names)
+        self.doc_texts = list(doc_texts)
+        self.doc_ids = np.asarray(doc_ids, dtype = np.int32)
+        self.starts = np.asarray(starts, dtype = np.int32)
+        self.ends = np.asarray(ends, dtype = np.int32)
+        self.doc_urls = list(doc_urls) if doc_urls is not None else [""] * len(self.doc_names)
+        self.doc_titles = list(doc_titles) if doc_titles is not None else [""] * len(self.doc_names)
+        self.section_names = list(section_names) if section_names is not None else []
+        if section_ids is None:
+            section_ids = np.full(len(self.doc_ids), -1)
+        self.section_ids = np.asarray(section_ids, dtype = np.int32)
+        if prev_ids is None or next_ids is None:
+            prev_ids, next_ids = neighbour_ids(self.doc_ids, self.starts)
+        self.prev_ids = np.asarray(prev_ids, dtype = np.int32)
+        self.next_ids = np.asarray(next_ids, dtype = np.int32)
+
+    @classmethod
+    def from_documents(cls, documents, spans):
+        """
+        Builds a store from `chunk_utils.load_documents` output and `chunk_documents` spans.
+        Each chunk is assigned the last section that starts at or before its start offset.
+        Spans must be in document order; each document's chunks are located with one binary search.
+
+        Args:
+            documents (list of tuple): (file_name, cleaned_text, metadata) triples.
+            spans (list of tuple): (doc_id, start, end) for every chunk.
+
+        Returns:
+            ChunkStore: The new store.
+        """
+        columns = np.array(spans, dtype = np.int32).reshape(-1, 3)
+        doc_ids, starts = columns[:, 0], columns[:, 1]
+
+        # Spans are in document order: chunks of document d are doc_bounds[d]:doc_bounds[d + 1]
+        doc_bounds = np.searchsorted(doc_ids, np.arange(len(documents) + 1))
+
+        section_lookup = {}
+        section_ids = np.full(len(columns), -1, dtype = np.int32)
+        for doc_id, (_, _, metadata) in enumerate(documents):
+            sections = metadata.get("sections", [])
+            if not sections:
+                continue
+            offsets = np.array([offset for offset, _ in sections])
+            table_ids = np.array([section_lookup.setdefault(heading, len(section_lookup)) for _, heading in sections])
+
+            in_doc = np.arange(doc_bounds[doc_id], doc_bounds[doc_id + 1])
+            position = np.searchsorted(offsets, starts[in_doc], side = "right") - 1
+            section_ids[in_doc] = np.where(position >= 0, table_ids[np.maximum(position, 0)], -1)
+        section_names = sorted(section_lookup, key = section_lookup.get)
+
+        return cls(
+            [name for name, _, _ in documents],
+            [text for _, text, _ in documents],
+            doc_ids, starts, columns[:, 2],
+            doc_urls = [metadata.get("url", "") for _, _, metadata in documents],
+            doc_titles = [metadata.get("title", "") for _, _, metadata in documents],
+            section_names = section_names,
+            section_ids = section_ids)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        return self.doc_texts[self.doc_ids[idx]][self.starts[idx]:self.ends[idx]]
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def span(self, idx):
+        """
+        Returns the (doc_id, start, end) span of a chunk.
+        """
+        return int(self.doc_ids[idx]), int(self.starts[idx]), int(self.ends[idx])
+
+    def window(self, idx, k):
+        """
+        Returns the ids of a chunk and up to `k` neighbours on each side within its
+        document, in document order. Each step is one array lookup.
+        """
+        before = []
+        current = int(self.prev_ids[idx])
+        while current >= 0 and len(before) < k:
+            before.append(current)
+            current = int(self.prev_ids[current])
+
+        after = []
+        current = int(self.next_ids[idx])
+        while current >= 0 and len(after) < k:
+            after.append(current)
+            current = int(self.next_ids[current])
+
+        return before[::-1] + [int(idx)] + after
+
+    def expand(self, ids, k):
+        """
+        Widens each hit to a window of `k` neighbours on each side and merges windows that
+        overlap or touch within a document into one contiguous passage.
+
+        Args:
+            ids (sequence of int): Hit chunk ids, best first.
+            k (int): Number of neighbours to add on each side.
+
+        Returns:
+            list of dict: One {"hits", "chunk_ids", "doc_id", "start", "end", "text"} passage per
+            group of merged hits, ordered by their best hit; "hits" lists the hit ids it covers.
+        """
+        windows = []
+        for order, idx in enumerate(ids):
+            chunk_ids = self.window(idx, k)
+            windows.append((int(self.doc_ids[idx]), int(self.starts[chunk_ids[0]]), int(self.ends[chunk_ids[-1]]),
+                            order, int(idx), chunk_ids))
+
+        # Sweep the windows in document order, merging each into the previous one if they overlap or touch
+        merged = []
+        for doc_id, start, end, order, idx, chunk_ids in sorted(windows):
+            last = merged[-1] if merged else None
+            if last is not None and last["doc_id"] == doc_id and start <= last["end"] + 1:
+                last["end"] = max(last["end"], end)
+                last["hits"].append((order, idx))
+                last["chunk_ids"].update(chunk_ids)
+            else:
+                merged.append({"hits": [(order, idx)], "chunk_ids": set(chunk_ids),
+                               "doc_id": doc_id, "start": start, "end": end})
+
+        passages = []
+        for passage in sorted(merged, key = lambda p: min(p["hits"])):
+            passage["hits"] = [idx for _, idx in sorted(passage["hits"])]
+            passage["chunk_ids"] = sorted(passage["chunk_ids"])
+            passage["text"] = self.doc_texts[passage["doc_id"]][passage["start"]:passage["end"]]
+            passages.append(passage)
+        return passages
+
+    def metadata(self, idx):
+        """
+        Returns the source metadata of a chunk.
+
+        Returns:
+            dict: {"doc_id", "source", "title", "section"} of the chunk.
+        """
+        doc_id = int(self.doc_ids[idx])
+        section_id = int(self.section_ids[idx])
+        return {
+            "doc_id": doc_id,
+            "source": self.doc_urls[doc_id],
+            "title": self.doc_titles[doc_id],
+            "section": self.section_names[section_id] if section_id >= 0 else ""
+        }
+
+    def filter_ids(self, source = None, title = None, section = None, doc_id = None):
+        """
+        Finds the chunks whose metadata matches every given predicate. String predicates
+        match case-insensitive substrings, lists match any of their values, and callables
+        are called with the field value. The doc and section tables are matched first, so
+        the per-chunk work is two vectorised lookups.
+
+        Args:
+            source: Predicate on the source URL.
+            title: Predicate on the page title.
+            section: Predicate on the section heading.
+            doc_id: Document id or list of document ids.
+
+        Returns:
+            np.ndarray: Sorted int64 ids of the matching chunks.
+        """
+        doc_mask = np.ones(len(self.doc_names), dtype = bool)
+        if doc_id is not None:
+            doc_mask &= np.isin(np.arange(len(self.doc_names)), np.atleast_1d(doc_id))
+        if source is not None:
+            doc_mask &= [_matches(source, url) for url in self.doc_urls]
+        if title is not None:
+            doc_mask &= [_matches(title, doc_title) for doc_title in self.doc_titles]
+
+        chunk_mask = doc_mask[self.doc_ids]
+        if section is not None:
+            # Append a False slot so chunks without a section (-1) never match
+            section_mask = np.array([_matches(section, name) for name in self.section_names] + [False], dtype = bool)
+            chunk_mask &= section_mask[self.section_ids]
+
+        return np.flatnonzero(chunk_mask).astype(np.int64)
+
+    def select(self, ids):
+        """
+        Returns a store holding only the given chunks, in the given order.
+        The documents are shared, only the span columns are copied; neighbour ids are
+        recomputed, so a dropped chunk is skipped over.
+
+        Args:
+            ids (sequence of int): Chunk indices to keep.
+
+        Returns:
+            ChunkStore: The filtered store.
+        """
+        ids = np.asarray(ids, dtype = np.int64)
+        return ChunkStore(
+            self.doc_names, self.doc_texts, self.doc_ids[ids], self.starts[ids], self.ends[ids],
+            doc_urls = self.doc_urls, doc_titles = self.doc_titles,
+            section_names = self.section_names, section_ids = self.section_ids[ids])
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory held by the store: document text plus span columns.
+        """
+        text_bytes = sum(len(text.encode("utf-8")) for text in self.doc_texts)
+        columns = (self.doc_ids, self.starts, self.ends, self.section_ids, self.prev_ids, self.next_ids)
+        return text_bytes + sum(column.nbytes for column in columns)
+
+    def save(self, output_folder):
+        """
+        Saves the documents and their metadata to documents.json and the span columns to chunks.npz.
+
+        Args:
+            output_folder (str): Directory to save the store in.
+
+        Returns:
+            None
+        """
+        os.makedirs(output_folder, exist_ok = True)
+
+        with open(f"{output_folder}/documents.json", "w", encoding = "utf-8") as f:
+            json.dump({
+                "names": self.doc_names,
+                "texts": self.doc_texts,
+                "urls": self.doc_urls,
+                "titles": self.doc_titles,
+                "sections": self.section_names
+            }, f, ensure_ascii = False)
+
+        np.savez(
+            f"{output_folder}/chunks.npz",
+            doc_ids = self.doc_ids, starts = self.starts, ends = self.ends, section_ids = self.section_ids,
+            prev_ids = self.prev_ids, next_ids = self.next_ids)
+        logger.info(f"Saved {len(self.doc_texts)} documents and {len(self)} chunk spans to {output_folder}")
+
+    @classmethod
+    def load(cls, folder_path):
+        """
+        Loads a store saved with `save`.
+
+        Args:
+            folder_path (str): Directory containing documents.json and chunks.npz.
+
+        Returns:
+            ChunkStore: The loaded store.
+        """
+        with open(f"{folder_path}/documents.json", "r", encoding = "utf-8") as f:
+            documents = json.load(f)
+
+        with np.load(f"{folder_path}/chunks.npz") as columns:
+            store = cls(
+                documents["names"], documents["texts"], columns["doc_ids"], columns["starts"], columns["ends"],
+                doc_urls = documents.get("urls"), doc_titles = documents.get("titles"),
+                section_names = documents.get("sections"),
+                section_ids = columns["section_ids"] if "section_ids" in columns else None,
+                prev_ids = columns["prev_ids"] if "prev_ids" in columns else None,
+                next_ids = columns["next_ids"] if "next_ids" in columns else None)
+
+        logger.info(f"Loaded {len(store.doc_texts)} documents and {len(store)} chunk spans from {folder_path}")
+        return store
+
+
+# --------------------------
+# Compute Neighbour Chunk IDs
+# --------------------------
+def neighbour_ids(doc_ids, starts):
+    """
+    Links every chunk to the chunks before and after it in its document, ordering chunks
+    by (document, start offset).
+
+    Args:
+        doc_ids (np.ndarray): Document of each chunk.
+        starts (np.ndarray): Start offset of each chunk.
+
+    Returns:
+        tuple: (prev_ids, next_ids) int32 arrays, -1 where there is no neighbour.
+    """
+    prev_ids = np.full(len(doc_ids), -1, dtype = np.int32)
+    next_ids = np.full(len(doc_ids), -1, dtype = np.int32)
+    if len(doc_ids) < 2:
+        return prev_ids, next_ids
+
+    order = np.lexsort((starts, doc_ids))
+    same_doc = doc_ids[order[1:]] == doc_ids[order[:-1]]
+    prev_ids[order[1:][same_doc]] = order[:-1][same_doc]
+    next_ids[order[:-1][same_doc]] = order[1:][same_doc]
+    return prev_ids, next_ids
+
+
+# --------------------------
+# Match a Metadata Predicate
+# --------------------------
+def _matches(predicate, value):
+    """
+    Checks a metadata value against a filter predicate (string, list of strings or callable).
+    """
+    if callable(predicate):
+        return bool(predicate(value))
+    if isinstance(predicate, (list, tuple, set)):
+        return any(_matches(p, value) for p in predicate)
+    return str(predicate).lower() in value.lower()
@@ -1,30 +1,94 @@
-from utils import read_from_file
+from utils import read_from_file, load_sources
 import logging
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 import os
 from preprocessing import clean_text
+from log_config import setup_logging
 
 
 # ---- Config ----
 folder_path = "/Users/trishika/Documents/My Projects/[1] HogRAG/data"
+default_separators = ("\n\n", "\n", ". ", " ")
 
-logging.basicConfig(
-    level = logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("hograg.log"),
-        logging.StreamHandler()]
-)
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Split Text into Chunk Spans
+# --------------------------
+def split_spans(text, chunk_size = 100, chunk_overlap = 50, separators = default_separators):
+    """
+    Splits text into overlapping chunks in a single left-to-right pass and returns
+    their character offsets instead of copies of the text.
+
+    Each chunk ends at the last occurrence of the highest-priority separator that fits
+    within `chunk_size` while keeping the chunk longer than `chunk_overlap` (falling back
+    to a hard cut), and the next chunk starts `chunk_overlap` characters before that end,
+    moved forward to a word boundary. Every step therefore advances, so the whole text is
+    scanned in linear time.
+
+    Args:
+        text (str): The already cleaned document text.
+        chunk_size (int): Maximum number of characters per chunk.
+        chunk_overlap (int): Number of characters shared by consecutive chunks.
+        separators (sequence of str): Break points to try, in order of preference.
+
+    Returns:
+        list of tuple: (start, end) offsets such that text[start:end] is the chunk.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    spans = []
+    n = len(text)
+    pos = 0
+    while pos < n and text[pos].isspace():
+        pos += 1
+
+    while pos < n:
+        limit = min(pos + chunk_size, n)
+        end = limit
+
+        if limit < n:
+            # Prefer the latest break of the strongest separator inside the window
+            for sep in separators:
+                i = text.rfind(sep, pos + chunk_overlap + 1, limit + len(sep) - 1)
+                if i != -1:
+                    end = i + len(sep.rstrip())
+                    break
+
+        # Trim trailing whitespace so every span starts and ends on text
+        cut = end
+        while end > pos and text[end - 1].isspace():
+            end -= 1
+        spans.append((pos, end))
+
+        if limit >= n:
+            break
+
+        # Step back by the overlap, then forward to the start of the next word
+        nxt = cut - chunk_overlap
+        if not text[nxt - 1].isspace():
+            boundary = text.find(" ", nxt, cut)
+            if boundary != -1:
+                nxt = boundary + 1
+        while nxt < n and text[nxt].isspace():
+            nxt += 1
+        pos = nxt
+
+    return spans
 
 # --------------------------
 # Chunk Text from a Single File
 # --------------------------
-def chunk_text(file_path):
+def chunk_text(file_path, chunk_size = 100, chunk_overlap = 50, separators = default_separators):
     """
-    Reads a text file, splits it into overlapping chunks, and returns a list of cleaned chunks.
+    Reads a text file, cleans it once, splits it into overlapping chunks, and returns the chunks.
 
     Args:
         file_path (str): The path to the text file to be chunked.
+        chunk_size (int): Maximum number of characters per chunk.
+        chunk_overlap (int): Number of characters shared by consecutive chunks.
+        separators (sequence of str): Break points to try, in order of preference.
 
     Returns:
         list of str: Cleaned and chunked text segments from the file.
@@ -35,31 +99,125 @@ def chunk_text(file_path):
 
         # If file is empty or unreadable
         if not paragraphs:
-                logging.warning(f"Content not found in {file_path}")
-                return ""
-        
-        # Initialize text splitter with chunk size and overlap
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size = 100,
-            chunk_overlap = 50,
-            # separators= ["\n\n", "\n", "  ", " "]
-        )
-
-        # Perform the text splitting
-        chunks = splitter.split_text(paragraphs)
-        # Clean each chunk using custom cleaner
-        cleaned_chunks = [clean_text(chunk) for chunk in chunks]
-        logging.info(f"Text from {file_path} split into {len(chunks)} chunks")
-
-        # for i, chunk in enumerate(chunks):
-        #     print(f"Chunk {i} ({len(chunk)} chars): \n {chunk} \n")
-            
-        return cleaned_chunks
+                logger.warning(f"Content not found in {file_path}")
+                return []
+
+        # Clean the whole document once, then split it in a single pass
+        document = clean_text(paragraphs)
+        spans = split_spans(document, chunk_size, chunk_overlap, separators)
+        logger.info(f"Text from {file_path} split into {len(spans)} chunks")
+
+        return [document[start:end] for start, end in spans]
     
     except Exception as e:
-        logging.exception(f"An error occured while chunking the file {file_path}: {e}")
+        logger.exception(f"An error occured while chunking the file {file_path}: {e}")
         return []
 
+# --------------------------------
+# Load and Clean All Text Files
+# --------------------------------
+def load_documents(folder_path):
+    """
+    Reads and cleans every .txt file in the folder, in a stable (sorted) order, and
+    attaches the source metadata recorded by the scraper in sources.json.
+
+    Args:
+        folder_path (str): Path to the folder containing text files.
+
+    Returns:
+        list of tuple: (file_name, cleaned_text, metadata) triples; the position in the list
+        is the doc_id. metadata holds "url", "title" and "sections", a list of
+        [offset, heading] pairs into cleaned_text.
+    """
+    documents = []
+    try:
+        sources = load_sources(os.path.join(folder_path, "sources.json"))
+        for file_name in sorted(os.listdir(folder_path)):
+            # Skip non-txt files
+            if not file_name.endswith(".txt"):
+                logger.info(f"Skipping non-text file: {file_name}")
+                continue
+
+            text = read_from_file(os.path.join(folder_path, file_name))
+            if not text:
+                logger.warning(f"Content not found in {file_name}")
+                continue
+
+            source = sources.get(file_name, {})
+            cleaned, sections = clean_sections(text, source.get("sections", []))
+            metadata = {"url": source.get("url", ""), "title": source.get("title", ""), "sections": sections}
+            documents.append((file_name, cleaned, metadata))
+
+        logger.info(f"Loaded {len(documents)} documents from {folder_path}")
+
+    except FileNotFoundError:
+        logger.error(f"Folder not found: {folder_path}")
+
+    except Exception as e:
+        logger.exception(f"Unexpected error while loading documents from {folder_path}: {e}")
+
+    return documents
+
+# ----------------------------------
+# Clean a Document Section by Section
+# ----------------------------------
+def clean_sections(text, sections):
+    """
+    Cleans a document one section at a time so that section start offsets recorded
+    against the raw text can be translated into offsets in the cleaned text.
+
+    Args:
+        text (str): The raw document text.
+        sections (list): [offset, heading] pairs into the raw text, in order.
+
+    Returns:
+        tuple: (cleaned_text, cleaned_sections) with sections as [offset, heading] into cleaned_text.
+    """
+    if not sections:
+        return clean_text(text), []
+
+    bounds = [0] + [offset for offset, _ in sections] + [len(text)]
+    headings = [None] + [heading for _, heading in sections]
+
+    parts = []
+    cleaned_sections = []
+    length = 0
+    for start, end, heading in zip(bounds, bounds[1:], headings):
+        part = clean_text(text[start:end])
+        if not part:
+            continue
+        if parts:
+            length += 1
+        if heading is not None:
+            cleaned_sections.append([length, heading])
+        parts.append(part)
+        length += len(part)
+
+    return " ".join(parts), cleaned_sections
+
+# --------------------------------
+# Chunk Loaded Documents into Spans
+# --------------------------------
+def chunk_documents(documents, chunk_size = 100, chunk_overlap = 50, separators = default_separators):
+    """
+    Splits every document into chunks and returns them as offsets into their document.
+
+    Args:
+        documents (list of tuple): (file_name, cleaned_text, metadata) triples from `load_documents`.
+        chunk_size (int): Maximum number of characters per chunk.
+        chunk_overlap (int): Number of characters shared by consecutive chunks.
+        separators (sequence of str): Break points to try, in order of preference.
+
+    Returns:
+        list of tuple: (doc_id, start, end) for every chunk, in document order.
+    """
+    chunk_spans = []
+    for doc_id, (file_name, text, _) in enumerate(documents):
+        spans = split_spans(text, chunk_size, chunk_overlap, separators)
+        chunk_spans.extend((doc_id, start, end) for start, end in spans)
+        logger.info(f"Text from {file_name} split into {len(spans)} chunks")
+    return chunk_spans
+
 # --------------------------------
 # Chunk All Text Files in a Folder
 # --------------------------------
@@ -77,30 +235,30 @@ def chunk_folder(folder_path):
     all_chunks = []
     try:
         # List all files in the given folder
-        existing_files = os.listdir(folder_path)
+        existing_files = sorted(os.listdir(folder_path))
         for file_name in existing_files:
             file_path = os.path.join(folder_path, file_name)
             
             # Skip non-txt files
             if not file_name.endswith(".txt"):
-                logging.info(f"Skipping non-text file: {file_name}")
+                logger.info(f"Skipping non-text file: {file_name}")
                 continue
 
-            logging.info(f"Chunking file: {file_path}")
+            logger.info(f"Chunking file: {file_path}")
             try:       
                chunks = chunk_text(file_path)
                all_chunks.extend(chunks)
             except Exception as e:
-                logging.error(f"Failed to chink file: {file_path}: {e}")
+                logger.error(f"Failed to chink file: {file_path}: {e}")
             
-        logging.info(f"Finished chunking {len(existing_files)} files. Total chunks: {len(all_chunks)}")
+        logger.info(f"Finished chunking {len(existing_files)} files. Total chunks: {len(all_chunks)}")
         return all_chunks
     
     except FileNotFoundError:
-        logging.error(f"Folder not found: {folder_path}")
+        logger.error(f"Folder not found: {folder_path}")
 
     except Exception as e:
-        logging.exception(f"Unexpected error while processing folder {folder_path}: {e}")
+        logger.exception(f"Unexpected error while processing folder {folder_path}: {e}")
 
     return []
 
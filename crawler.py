@@ -0,0 +1,316 @@
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, quote, unquote
+from scraper import file_path, read_urls_from_file, scrape_page
+from utils import save_to_file, record_source, load_sources
+from log_config import setup_logging
+
+
+# ---- Config ----
+frontier_path = "data/frontier.json"
+max_depth = 1
+checkpoint_every = 10
+request_delay = 1.0  # seconds between requests, to be polite to the wiki
+max_retries = 2
+
+# MediaWiki/Fandom namespaces; pages in them are not articles
+skipped_namespaces = {"file", "image", "category", "special", "template", "user", "user_blog", "talk", "help",
+                      "forum", "message_wall", "board", "mediawiki", "module", "map", "media", "blog"}
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+# --------------------------
+# Canonicalize a URL
+# --------------------------
+def canonicalize_url(url):
+    """
+    Normalizes a wiki URL so that different spellings of the same page compare equal:
+    lower-case scheme and host, no query string or fragment, spaces as underscores and a
+    single percent-encoding of the path (so "%27" and "'" are the same page).
+
+    Args:
+        url (str): Absolute URL.
+
+    Returns:
+        str: The canonical URL.
+    """
+    parts = urlsplit(url.strip())
+    path = unquote(parts.path).replace(" ", "_")
+    path = quote(path, safe = "/:@!$&()*+,;=-._~")
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, "", ""))
+
+
+def in_scope(url, domains, path_prefix = "/wiki/"):
+    """
+    Checks whether a canonical URL is an article on one of the crawled wikis.
+
+    Args:
+        url (str): Canonical URL.
+        domains (set of str): Allowed host names.
+        path_prefix (str): Path prefix of article pages.
+
+    Returns:
+        bool: True if the URL should be crawled.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or parts.netloc not in domains:
+        return False
+    if not parts.path.startswith(path_prefix):
+        return False
+
+    title = unquote(parts.path[len(path_prefix):])
+    if not title:
+        return False
+    namespace, sep, _ = title.partition(":")
+    if sep and (namespace.lower() in skipped_namespaces or namespace.lower().endswith("_talk")):
+        return False
+    return True
+
+
+# --------------------------
+# Persistent Crawl Frontier
+# --------------------------
+class CrawlFrontier:
+    """
+    Breadth-first crawl queue that remembers every URL it has seen and checkpoints its
+    state to a JSON file, so an interrupted crawl resumes where it stopped.
+
+    URLs are canonicalized before they are compared, links outside `domains` or deeper than
+    `max_depth` are dropped, and titles of saved pages are tracked so a page reached through
+    a redirect under another URL is not saved twice. Titles already recorded in the sources
+    file count as saved, which covers pages saved just before a crash and pages from
+    earlier `scrape_urls` runs. A page file written just before a crash but never recorded
+    is removed on resume, since its URL is still pending and the page is fetched again.
+
+    Args:
+        path (str): Checkpoint file; loaded if it exists.
+        max_depth (int): Maximum link distance from the seed URLs.
+        domains (set of str): Allowed host names; defaults to the hosts of the seed URLs.
+        sources_path (str): Sources file written by `record_source`.
+    """
+
+    def __init__(self, path = frontier_path, max_depth = max_depth, domains = None, sources_path = "data/sources.json"):
+        self.path = path
+        self.max_depth = max_depth
+        self.domains = set(domains or ())
+        self.pending = deque()
+        self.visited = set()
+        self.failures = {}
+        self.sources_path = sources_path
+        self.titles = {source["title"] for source in load_sources(sources_path).values() if source.get("title")}
+        self._seen = set()
+
+        if os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def seed(self, urls):
+        """
+        Adds start URLs at depth 0; their hosts become part of the crawl scope.
+
+        Returns:
+            int: Number of URLs that were new.
+        """
+        added = 0
+        for url in urls:
+            self.domains.add(urlsplit(canonicalize_url(url)).netloc)
+            added += self.add(url, 0)
+        return added
+
+    def add(self, url, depth):
+        """
+        Queues a URL if it is in scope, within the depth limit and not seen before.
+
+        Returns:
+            bool: True if the URL was queued.
+        """
+        if depth > self.max_depth:
+            return False
+        url = canonicalize_url(url)
+        if url in self._seen or not in_scope(url, self.domains):
+            return False
+        self._seen.add(url)
+        self.pending.append((url, depth))
+        return True
+
+    def pop(self):
+        """
+        Returns the next (url, depth) to crawl.
+        """
+        return self.pending.popleft()
+
+    def mark_visited(self, url, title = None):
+        """
+        Records a crawled URL and, if its page was saved, its title.
+        """
+        self.visited.add(url)
+        self.failures.pop(url, None)
+        if title:
+            self.titles.add(title)
+
+    def mark_failed(self, url, depth, retries = max_retries):
+        """
+        Re-queues a URL whose fetch failed at the back of the queue, until it has failed
+        `retries` more times; after that it is treated as visited.
+
+        Returns:
+            bool: True if the URL was re-queued.
+        """
+        self.failures[url] = self.failures.get(url, 0) + 1
+        if self.failures[url] > retries:
+            logger.warning(f"Giving up on {url} after {self.failures[url]} failed attempts")
+            self.visited.add(url)
+            return False
+        self.pending.append((url, depth))
+        return True
+
+    def save(self):
+        """
+        Writes the frontier to its checkpoint file atomically (temporary file + rename), so a
+        crash during the write leaves the previous checkpoint intact.
+        """
+        state = {
+            "domains": sorted(self.domains),
+            "visited": sorted(self.visited),
+            "pending": [[url, depth] for url, depth in self.pending],
+            "failures": self.failures,
+            "titles": sorted(self.titles)
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok = True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding = "utf-8") as f:
+            json.dump(state, f, ensure_ascii = False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """
+        Restores the frontier from its checkpoint file.
+        """
+        with open(self.path, "r", encoding = "utf-8") as f:
+            state = json.load(f)
+        self.domains.update(state.get("domains", []))
+        self.visited = set(state.get("visited", []))
+        self.pending = deque((url, depth) for url, depth in state.get("pending", []))
+        self.failures = state.get("failures", {})
+        self.titles.update(state.get("titles", []))
+        self._seen = self.visited | {url for url, _ in self.pending}
+        self.remove_orphans()
+        logger.info(f"Resumed crawl frontier from {self.path}: {len(self.visited)} visited, "
+                    f"{len(self.pending)} pending")
+
+    def remove_orphans(self):
+        """
+        Deletes page files numbered after the last file in the sources file. `save_to_file`
+        numbers files in order, so these were written by a crawl that stopped before
+        `record_source` ran; their pages were never marked visited and are fetched again.
+
+        Returns:
+            list of str: Names of the removed files.
+        """
+        recorded = [int(name[:-4]) for name in load_sources(self.sources_path) if name[:-4].isdigit()]
+        data_dir = os.path.dirname(self.sources_path) or "."
+        if not recorded or not os.path.isdir(data_dir):
+            return []
+
+        removed = []
+        for name in sorted(os.listdir(data_dir)):
+            if name.endswith(".txt") and name[:-4].isdigit() and int(name[:-4]) > max(recorded):
+                os.remove(os.path.join(data_dir, name))
+                removed.append(name)
+        if removed:
+            logger.warning(f"Removed {len(removed)} page files without a recorded source: {', '.join(removed)}")
+        return removed
+
+
+# --------------------------
+# Crawl the Frontier
+# --------------------------
+def crawl(frontier, max_pages = None, delay = request_delay, checkpoint_every = checkpoint_every):
+    """
+    Fetches pages from the frontier until it is empty or `max_pages` pages were fetched,
+    saving each new page with `save_to_file` / `record_source` and queueing the in-scope
+    links it contains. The frontier is checkpointed every `checkpoint_every` pages and on
+    exit, including on Ctrl+C or an error.
+
+    Args:
+        frontier (CrawlFrontier): The frontier to crawl.
+        max_pages (int): Maximum number of pages to fetch in this run, or None for no limit.
+        delay (float): Seconds to wait between requests.
+        checkpoint_every (int): Pages between checkpoints and throughput reports.
+
+    Returns:
+        int: Number of pages saved in this run.
+    """
+    fetched = 0
+    saved = 0
+    start = time.perf_counter()
+
+    def report():
+        minutes = (time.perf_counter() - start) / 60
+        rate = fetched / minutes if minutes > 0 else 0.0
+        logger.info(f"Crawl: {fetched} fetched, {saved} saved, {rate:.1f} pages/min, "
+                    f"{len(frontier)} pending, {len(frontier.visited)} visited")
+
+    try:
+        while len(frontier) and (max_pages is None or fetched < max_pages):
+            url, depth = frontier.pop()
+            if fetched:
+                time.sleep(delay)
+            page = scrape_page(url)
+            fetched += 1
+
+            if page is None:
+                frontier.mark_failed(url, depth)
+            else:
+                title = None
+                if page["text"] and page["title"] not in frontier.titles:
+                    file_name = save_to_file(page["text"])
+                    record_source(file_name, url, page["title"], page["sections"])
+                    if file_name:
+                        title = page["title"]
+                        saved += 1
+
+                if depth < frontier.max_depth:
+                    new_links = sum(frontier.add(link, depth + 1) for link in page["links"])
+                    logger.info(f"Queued {new_links} new links from {url} (depth {depth})")
+                frontier.mark_visited(url, title)
+
+            if fetched % checkpoint_every == 0:
+                frontier.save()
+                report()
+    finally:
+        frontier.save()
+        report()
+
+    return saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Crawl the wiki from urls.txt, resuming from the last checkpoint.")
+    parser.add_argument("--urls", default = file_path, help = "Seed URL file")
+    parser.add_argument("--frontier", default = frontier_path, help = "Checkpoint file")
+    parser.add_argument("--depth", type = int, default = max_depth, help = "Maximum link depth from the seeds")
+    parser.add_argument("--max-pages", type = int, help = "Stop after fetching this many pages")
+    parser.add_argument("--delay", type = float, default = request_delay, help = "Seconds between requests")
+    parser.add_argument("--reset", action = "store_true", help = "Discard the checkpoint and start over")
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(args.frontier):
+        os.remove(args.frontier)
+
+    frontier = CrawlFrontier(args.frontier, args.depth)
+    added = frontier.seed(read_urls_from_file(args.urls))
+    logger.info(f"Seeded {added} new URLs; {len(frontier)} pending")
+    crawl(frontier, args.max_pages, args.delay)
@@ -0,0 +1,206 @@
+import logging
+import json
+import os
+import zlib
+import numpy as np
+from log_config import setup_logging
+
+
+# ---- Config ----
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+# --------------------------
+# Split Text into Shingles
+# --------------------------
+def shingle(text, shingle_size = 5):
+    """
+    Breaks a chunk into a set of hashed character shingles.
+
+    Character shingles are used instead of word shingles because chunks are only
+    ~100 characters long, which leaves too few word n-grams for a stable signature.
+
+    Args:
+        text (str): The chunk text.
+        shingle_size (int): Number of characters per shingle.
+
+    Returns:
+        np.ndarray: Unique 32-bit shingle hashes (uint64 dtype).
+    """
+    text = " ".join(text.lower().split())
+    if len(text) <= shingle_size:
+        grams = {text}
+    else:
+        grams = {text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype = np.uint64, count = len(grams))
+
+
+# --------------------------
+# Compute MinHash Signature
+# --------------------------
+def minhash_signature(hashes, perm_a, perm_b):
+    """
+    Computes the MinHash signature of a set of shingle hashes.
+
+    Args:
+        hashes (np.ndarray): Shingle hashes from `shingle`.
+        perm_a (np.ndarray): Multipliers of the universal hash permutations.
+        perm_b (np.ndarray): Offsets of the universal hash permutations.
+
+    Returns:
+        np.ndarray: Signature with one minimum per permutation.
+    """
+    if len(hashes) == 0:
+        return np.full(len(perm_a), _MAX_HASH, dtype = np.uint64)
+    permuted = np.bitwise_and((np.outer(hashes, perm_a) + perm_b) % _MERSENNE_PRIME, _MAX_HASH)
+    return permuted.min(axis = 0)
+
+
+# --------------------------
+# Choose LSH Banding
+# --------------------------
+def choose_bands(num_perm, threshold):
+    """
+    Picks the (bands, rows) split of the signature whose LSH S-curve threshold
+    (1/b)^(1/r) is closest to the requested similarity threshold.
+
+    Args:
+        num_perm (int): Signature length.
+        threshold (float): Target Jaccard similarity.
+
+    Returns:
+        tuple: (bands, rows) with bands * rows <= num_perm.
+    """
+    best = (num_perm, 1)
+    best_gap = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        gap = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+
+# --------------------------------
+# Remove Near-Duplicate Chunks
+# --------------------------------
+def dedup_chunks(chunks, threshold = 0.85, num_perm = 128, shingle_size = 5, seed = 1):
+    """
+    Drops chunks that are near-duplicates of an earlier chunk using MinHash + LSH.
+
+    Chunks are processed in order and the first occurrence of a group of near-duplicates
+    is kept as the canonical chunk. Candidates come from the LSH buckets of kept chunks
+    and are confirmed with the estimated Jaccard similarity before being dropped.
+
+    Args:
+        chunks (list of str): The text chunks, in ingest order.
+        threshold (float): Minimum estimated Jaccard similarity to treat two chunks as duplicates.
+        num_perm (int): Number of MinHash permutations.
+        shingle_size (int): Number of characters per shingle.
+        seed (int): Seed for the hash permutations, so runs are reproducible.
+
+    Returns:
+        tuple: A tuple (keep, canonical) where:
+            - keep (list of int): Indices of the chunks to keep, in order.
+            - canonical (dict): Maps each dropped chunk index to the index of its kept canonical chunk.
+    """
+    rng = np.random.RandomState(seed)
+    perm_a = rng.randint(1, 1 << 32, size = num_perm, dtype = np.uint64)
+    perm_b = rng.randint(0, 1 << 32, size = num_perm, dtype = np.uint64)
+    bands, rows = choose_bands(num_perm, threshold)
+
+    keep = []
+    canonical = {}
+    exact = {}
+    signatures = {}
+    buckets = [dict() for _ in range(bands)]
+
+    for i, chunk in enumerate(chunks):
+        # Exact duplicates never need a signature
+        key = " ".join(chunk.lower().split())
+        if key in exact:
+            canonical[i] = exact[key]
+            continue
+
+        signature = minhash_signature(shingle(chunk, shingle_size), perm_a, perm_b)
+        band_keys = [signature[b * rows:(b + 1) * rows].tobytes() for b in range(bands)]
+
+        # Collect kept chunks sharing at least one band and confirm the best match
+        best_idx, best_sim = None, threshold
+        seen = set()
+        for b, band_key in enumerate(band_keys):
+            for candidate in buckets[b].get(band_key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                sim = float(np.mean(signatures[candidate] == signature))
+                if sim >= best_sim:
+                    best_idx, best_sim = candidate, sim
+
+        if best_idx is not None:
+            canonical[i] = best_idx
+            continue
+
+        keep.append(i)
+        exact[key] = i
+        signatures[i] = signature
+        for b, band_key in enumerate(band_keys):
+            buckets[b].setdefault(band_key, []).append(i)
+
+    total = len(chunks)
+    dropped = len(canonical)
+    reduction = (dropped / total * 100) if total else 0.0
+    logger.info(f"Deduplication kept {len(keep)} of {total} chunks, dropped {dropped} ({reduction:.1f}% reduction)")
+    return keep, canonical
+
+
+# --------------------------------
+# Save Dedup Pointers to Disk
+# --------------------------------
+def save_dedup_map(keep, canonical, chunks, output_folder = "embeddings"):
+    """
+    Saves the mapping from each dropped chunk to its canonical chunk.
+
+    The pre-dedup chunk list is not saved, so each dropped chunk is identified by its own
+    (doc_id, start, end) span into the saved documents (or its text, for a plain list of
+    chunks) and points at the vector ID of its canonical chunk, i.e. its position in the
+    saved embeddings. A dropped chunk can always be traced back and resolved to a stored vector.
+
+    Args:
+        keep (list of int): Indices of the kept chunks, as returned by `dedup_chunks`.
+        canonical (dict): Dropped chunk index -> canonical chunk index.
+        chunks (ChunkStore or list of str): The chunks `dedup_chunks` ran on.
+        output_folder (str): Directory to save the dedup map in.
+
+    Returns:
+        None
+    """
+    try:
+        os.makedirs(output_folder, exist_ok = True)
+
+        vector_ids = {chunk_idx: vector_id for vector_id, chunk_idx in enumerate(keep)}
+        dropped = []
+        for chunk_idx, canonical_idx in sorted(canonical.items()):
+            entry = {"span": list(chunks.span(chunk_idx))} if hasattr(chunks, "span") else {"text": chunks[chunk_idx]}
+            entry["vector_id"] = vector_ids[canonical_idx]
+            dropped.append(entry)
+
+        total = len(keep) + len(canonical)
+        dedup_map = {
+            "total_chunks": total,
+            "kept_chunks": len(keep),
+            "dropped_chunks": len(canonical),
+            "reduction": (len(canonical) / total) if total else 0.0,
+            "dropped": dropped
+        }
+
+        with open(f"{output_folder}/dedup.json", "w", encoding = "utf-8") as f:
+            json.dump(dedup_map, f, ensure_ascii = False)
+        logger.info(f"Saved dedup map for {len(canonical)} dropped chunks to {output_folder}/dedup.json")
+
+    except Exception as e:
+        logger.error(f"Error saving dedup map: {e}")
@@ -3,19 +3,20 @@ import os
 import logging
 import numpy as np
 import json
-from chunk_utils import chunk_folder
+from chunk_utils import load_documents, chunk_documents
+from chunk_store import ChunkStore
+from dedup import dedup_chunks, save_dedup_map
+from reduction import fit_reducer, apply_reducer, save_reducer, remove_reducer, reduction_report
+from log_config import setup_logging
 
 # ---- Config ----
 folder_path = "Users/trishika/Documents/My Projects/[1] HogRAG/data"
-model = SentenceTransformer("all-mpnet-base-v2")
+model = None  # loaded on first use, so importing this module doesn't load the encoder
+dedup_threshold = 0.85
+reduce_dim = None  # e.g. 256 to store PCA-reduced vectors
 
-logging.basicConfig(
-    level = logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("hograg.log"),
-        logging.StreamHandler()]
-)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 # -----------------------------------
@@ -23,7 +24,7 @@ logging.basicConfig(
 # -----------------------------------
 def embed_chunks(chunks):
     """
-    Embeds a list of text chunks using the global embedding model.
+    Embeds a list of text chunks using the global embedding model, loading it on first use.
 
     Args:
         chunks (list of str): The text chunks to embed.
@@ -31,8 +32,12 @@ def embed_chunks(chunks):
     Returns:
         np.ndarray or None: Array of vector embeddings, or None if embedding fails.
     """
+    global model
     try:
-        logging.info(f"Starting embedding for {len(chunks)} chunks")
+        if model is None:
+            model = load_embedder()
+
+        logger.info(f"Starting embedding for {len(chunks)} chunks")
 
         # Prefix format for instruction-tuned models like MPNet
         formatted_chunks = [f"passage: {chunk}" for chunk in chunks]
@@ -40,10 +45,10 @@ def embed_chunks(chunks):
         # Perform embedding 
         embeddings = model.encode(formatted_chunks, normalize_embeddings = True)
 
-        logging.info("Successfully generated embeddings")
+        logger.info("Successfully generated embeddings")
         return embeddings
     except Exception as e:
-        logging.error(f"Error during embedding chunks: {e}")
+        logger.error(f"Error during embedding chunks: {e}")
         return None
 
 
@@ -53,10 +58,11 @@ def embed_chunks(chunks):
 def save_embeddings(embeddings, chunks, output_folder = "embeddings"):
     """
     Saves the embeddings and corresponding metadata (text chunks) to disk.
+    A ChunkStore is saved as documents plus chunk spans, a plain list as metadata.json.
 
     Args:
         embeddings (np.ndarray): The embedding matrix.
-        chunks (list of str): The original text chunks.
+        chunks (ChunkStore or list of str): The original text chunks.
         output_folder (str): Directory to save embedding files.
 
     Returns:
@@ -68,31 +74,36 @@ def save_embeddings(embeddings, chunks, output_folder = "embeddings"):
 
         # Save embeddings as a .npy file
         np.save(f"{output_folder}/embedding.npy", embeddings)
-        logging.info(f"Saved embeddings to {output_folder}/embeddings.py")
-
-        # Save text chunks (metadata) as JSON
-        with open(f"{output_folder}/metadata.json", "w", encoding = "utf-8") as f:
-            json.dump(chunks, f, ensure_ascii = False, indent = 2)
-        logging.info(f"Saved {len(chunks)} embeddings and metadata succcessfully.")
+        logger.info(f"Saved embeddings to {output_folder}/embeddings.py")
+
+        # Save text chunks (metadata) as document spans, or as JSON for plain lists
+        if isinstance(chunks, ChunkStore):
+            chunks.save(output_folder)
+        else:
+            with open(f"{output_folder}/metadata.json", "w", encoding = "utf-8") as f:
+                json.dump(chunks, f, ensure_ascii = False, indent = 2)
+        logger.info(f"Saved {len(chunks)} embeddings and metadata succcessfully.")
     
     except Exception as e:
-        logging.error(f"Error saving embeddings or metadata: {e}")
+        logger.error(f"Error saving embeddings or metadata: {e}")
 
 
 # --------------------------------------
 # Load Embeddings and Metadata from Disk
 # --------------------------------------
-def load_embeddings(folder_path):
+def load_embeddings(folder_path, mmap = False):
     """
     Loads the saved embeddings and their corresponding text chunks from disk.
+    Span storage (chunks.npz) is preferred; older folders fall back to metadata.json.
 
     Args:
         folder_path (str): Path to the folder containing the embedding files.
+        mmap (bool): Memory-map embedding.npy read-only instead of reading it into RAM.
 
     Returns:
         tuple: A tuple (embeddings, chunks) where:
             - embeddings (np.ndarray)
-            - chunks (list of str)
+            - chunks (ChunkStore or list of str)
 
     Raises:
         ValueError: If the number of embeddings and metadata entries don't match.
@@ -100,22 +111,25 @@ def load_embeddings(folder_path):
     try:
         # Load embedding vectors
         embedding_file_path = folder_path + "/embedding.npy"
-        loaded_embeddings = np.load(embedding_file_path)
+        loaded_embeddings = np.load(embedding_file_path, mmap_mode = "r" if mmap else None)
 
         # Load corresponding chunk metadata
-        metadata_file_path = folder_path + "/metadata.json"
-        with open(metadata_file_path, "r", encoding = "utf-8") as f:
-            loaded_chunks = json.load(f)
+        if os.path.exists(folder_path + "/chunks.npz"):
+            loaded_chunks = ChunkStore.load(folder_path)
+        else:
+            metadata_file_path = folder_path + "/metadata.json"
+            with open(metadata_file_path, "r", encoding = "utf-8") as f:
+                loaded_chunks = json.load(f)
 
         # Sanity check: match length
         if len(loaded_embeddings) != len(loaded_chunks):
             raise ValueError("Mismtach between the number of embeddings and chunks")
         
-        logging.info(f"Loaded {len(loaded_embeddings)} embbeddings and {len(loaded_chunks)} chunks")
+        logger.info(f"Loaded {len(loaded_embeddings)} embbeddings and {len(loaded_chunks)} chunks")
         return loaded_embeddings, loaded_chunks
     
     except Exception as e:
-        logging.error(f"Error loading data: {e}")
+        logger.error(f"Error loading data: {e}")
 
 # --------------------------
 # Initialize Embedding Model
@@ -132,13 +146,32 @@ def load_embedder(mode_name = "all-mpnet-base-v2"):
     """
     try:
         model = SentenceTransformer(mode_name)
-        logging.info(f"Embedding model {mode_name} loaded")
+        logger.info(f"Embedding model {mode_name} loaded")
         return model
     except Exception as e:
-        logging.error(f"Error logging embedding modelL {e}")
+        logger.error(f"Error logging embedding modelL {e}")
 
 
 if __name__ == "__main__":
-    all_chunks = chunk_folder(folder_path)
-    embeddings = embed_chunks(all_chunks)
-    save_embeddings(embeddings, all_chunks)
+    documents = load_documents(folder_path)
+    all_chunks = ChunkStore.from_documents(documents, chunk_documents(documents))
+
+    # Drop near-duplicate chunks before paying for their embeddings
+    keep, canonical = dedup_chunks(all_chunks, threshold = dedup_threshold)
+    unique_chunks = all_chunks.select(keep)
+    save_dedup_map(keep, canonical, all_chunks)
+
+    embeddings = embed_chunks(unique_chunks)
+
+    # Optionally reduce dimensionality; the reducer is saved so queries get the same transform
+    if reduce_dim:
+        reducer = fit_reducer(embeddings, reduce_dim)
+        reduced = apply_reducer(embeddings, reducer)
+        reduction_report(embeddings, reduced)
+        save_reducer(reducer)
+        embeddings = reduced
+    else:
+        # A reducer from an earlier reduced build would otherwise be applied to queries
+        remove_reducer()
+
+    save_embeddings(embeddings, unique_chunks)
@@ -1,6 +1,10 @@
 from gpt4all import GPT4All
-from vector_db import semantic_search, load_embedder, load_faiss_index
+from vector_db import semantic_search, load_embedder, load_faiss_index, retrieve_context, get_retriever
 from embedding import load_embeddings
+from reduction import load_reducer
+from profiling import profile_request
+from query_cache import get_query_cache
+from log_config import setup_logging, query_logger
 import logging
 
 
@@ -8,13 +12,8 @@ import logging
 model_path = "/Users/trishika/Documents/My Projects/[1] HogRAG/model/GPT4All-13B-snoozy.ggmlv3.q4_0.bin"
 folder_path = "/Users/trishika/Documents/My Projects/[1] HogRAG/embeddings"
 
-logging.basicConfig(
-    level = logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("hograg.log"),
-        logging.StreamHandler()]
-)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 # --------------------------
@@ -71,7 +70,7 @@ def build_prompt(context_chunks, user_query):
     
     except Exception as e:
         # Handle any unexpected errors and return a fallback message
-        logging.error(f"Failed to build prompt: {e}")
+        logger.error("Failed to build prompt: %s", e)
         return "You are a helpful assistant, but the prompt could not be generated."
 
 # --------------------------
@@ -89,10 +88,74 @@ def load_llm():
         return GPT4All(model_path)
     except Exception as e:
         # Log any loading error and re-raise
-        logging.error("Failed to load GPT4All model: {e}")
+        logger.error("Failed to load GPT4All model: %s", e)
         raise
 
+# ---------------------------------
+# Answer a Query End to End
+# ---------------------------------
+def answer_query(user_query, llm, filters = None, profile = False, request_id = None):
+    """
+    Retrieves context for a query, builds the prompt and generates the answer.
+
+    Answers and retrieval results precomputed by `warm_cache.py` for the index snapshot
+    being served are used first: a cached answer skips retrieval and generation, a cached
+    retrieval skips the search. Filtered queries are never cached.
+
+    The request is profiled when `profile` is set or when it is sampled by HOGRAG_PROFILE
+    (see `profiling.profile_request`); the report includes the context and prompt sizes.
+
+    Args:
+        user_query (str): The question entered by the user.
+        llm (GPT4All): The loaded language model.
+        filters (dict): Optional metadata predicates to scope retrieval.
+        profile (bool): Profile this request regardless of sampling.
+        request_id (str): Tag for the profile report.
+
+    Returns:
+        str: The generated answer.
+    """
+    with profile_request(request_id, force = profile) as prof:
+        # The version the retriever serves, so cached entries match what a search would return
+        version = get_retriever().version if filters is None else None
+        answer, context_chunks = lookup_cache(version, user_query)
+        if answer is not None:
+            prof.annotate(cache = "answer")
+            return answer
+
+        if context_chunks is None:
+            context_chunks = retrieve_context(user_query, filters = filters)
+        else:
+            prof.annotate(cache = "retrieval")
+        prompt = build_prompt([chunk["text"] for chunk in context_chunks], user_query)
+        prof.annotate(context_chunks = len(context_chunks), prompt_chars = len(prompt))
 
+        response = llm.generate(prompt, max_tokens = 512, temp = 0.7)
+        prof.annotate(response_chars = len(response))
+
+    return response
+
+
+def lookup_cache(version, user_query):
+    """
+    Looks a query up in the precomputed answer and retrieval stores of an index version.
+    Cache errors are logged and treated as misses.
+
+    Returns:
+        tuple: (answer, context_chunks), each None on a miss.
+    """
+    if version is None:
+        return None, None
+    try:
+        cache = get_query_cache()
+        answer = cache.get_answer(version, user_query)
+        if answer is not None:
+            query_logger.info("Served cached answer for %r from index %s", user_query, version)
+            return answer, None
+        return None, cache.get_retrieval(version, user_query)
+    except Exception as e:
+        logger.error("Query cache lookup failed: %s", e)
+        return None, None
 
 
 if __name__ == "__main__":
@@ -103,7 +166,7 @@ if __name__ == "__main__":
     embeddings, chunks = load_embeddings(folder_path)
     index = load_faiss_index()
     model = load_embedder()
-    context_chunks = semantic_search(user_query, model, index, chunks)
+    context_chunks = semantic_search(user_query, model, index, chunks, reducer = load_reducer(folder_path))
 
     # STEP-2: Load LLM
     llm = load_llm()
@@ -0,0 +1,374 @@
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import faiss
+import numpy as np
+from llm import answer_query
+from snapshot import publish_snapshot
+from vector_db import Retriever, set_retriever
+
+
+# ---- Config ----
+default_queries = [
+    "Who is Harry Potter?",
+    "Describe Diagon Alley.",
+    "What happens in Chapter 1 of Philosopher's Stone?",
+    "Who founded Hogwarts?",
+    "What is a Horcrux?",
+    "How did Sirius Black escape from Azkaban?",
+    "What is the Marauder's Map?",
+    "Who killed Dumbledore?",
+    "What are the Deathly Hallows?",
+    "Which house was Luna Lovegood in?"
+]
+_LORE_WORDS = ("Harry", "Hermione", "Ron", "Hogwarts", "wand", "Dumbledore", "Snape", "Voldemort", "castle",
+               "spell", "Quidditch", "Gryffindor", "Slytherin", "owl", "potion", "the", "of", "and", "was", "a")
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------
+# Deterministic Stub Encoder
+# --------------------------
+class StubEncoder:
+    """
+    Drop-in for SentenceTransformer.encode: returns a unit vector seeded by the text's hash,
+    so the same text always maps to the same vector, after a configurable delay.
+
+    Args:
+        dim (int): Embedding dimensionality (must match the index).
+        delay (float): Seconds to sleep per encode call.
+        per_text_delay (float): Extra seconds to sleep per text in the batch.
+    """
+
+    def __init__(self, dim = 768, delay = 0.02, per_text_delay = 0.0):
+        self.dim = dim
+        self.delay = delay
+        self.per_text_delay = per_text_delay
+
+    def encode(self, texts, normalize_embeddings = True, **kwargs):
+        time.sleep(self.delay + self.per_text_delay * len(texts))
+        vectors = np.empty((len(texts), self.dim), dtype = np.float32)
+        for i, text in enumerate(texts):
+            vectors[i] = np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(self.dim)
+        if normalize_embeddings:
+            faiss.normalize_L2(vectors)
+        return vectors
+
+
+# --------------------------
+# Deterministic Stub LLM
+# --------------------------
+class StubLLM:
+    """
+    Drop-in for GPT4All.generate: sleeps for a prompt-processing time proportional to the
+    prompt length plus a per-token decoding time, then returns a fixed-length answer.
+
+    Args:
+        token_delay (float): Seconds per generated token.
+        tokens (int): Number of tokens to "generate" (capped by max_tokens).
+        prompt_delay (float): Seconds per prompt character.
+    """
+
+    def __init__(self, token_delay = 0.005, tokens = 64, prompt_delay = 0.00001):
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.prompt_delay = prompt_delay
+
+    def generate(self, prompt, max_tokens = 512, temp = 0.7, **kwargs):
+        tokens = min(self.tokens, max_tokens)
+        time.sleep(len(prompt) * self.prompt_delay + tokens * self.token_delay)
+        return " ".join(["answer"] * tokens)
+
+
+# --------------------------
+# Synthetic Search Backend
+# --------------------------
+def synthetic_snapshot(encoder, root, num_chunks = 20000, seed = 0):
+    """
+    Publishes a flat index over random lore-like chunks embedded with the stub encoder as
+    a snapshot under `root`, for runs that need no data on disk.
+
+    Returns:
+        str: The published snapshot version.
+    """
+    rng = random.Random(seed)
+    chunks = [" ".join(rng.choice(_LORE_WORDS) for _ in range(16)) for _ in range(num_chunks)]
+    delay, encoder.delay = encoder.delay, 0.0
+    embeddings = encoder.encode(chunks)
+    encoder.delay = delay
+
+    folder = os.path.join(root, "embeddings")
+    os.makedirs(folder, exist_ok = True)
+    np.save(os.path.join(folder, "embedding.npy"), embeddings)
+    with open(os.path.join(folder, "metadata.json"), "w", encoding = "utf-8") as f:
+        json.dump(chunks, f)
+
+    index = faiss.IndexFlatL2(encoder.dim)
+    index.add(embeddings)
+    return publish_snapshot(index, folder, root)
+
+
+# --------------------------
+# Time the Pipeline Stages
+# --------------------------
+class StageTimer:
+    """
+    Adds up the time each thread spends in wrapped calls, per stage, so the stages of a
+    request can be timed while it runs through `answer_query` unchanged.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def reset(self):
+        self._local.stages = {}
+
+    def stages(self):
+        return dict(getattr(self._local, "stages", {}))
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stages = self._local.stages
+                stages[stage] = stages.get(stage, 0.0) + time.perf_counter() - start
+        return timed
+
+
+def instrument(retriever, llm, timer):
+    """
+    Times the retriever's searches and the LLM's generation with `timer`. A search that
+    returns nothing (`semantic_search` logs and swallows its errors) raises instead, so it
+    counts as a failed request rather than a fast one.
+    """
+    search = timer.wrap("retrieve", retriever.search)
+
+    def checked_search(query, *args, **kwargs):
+        results = search(query, *args, **kwargs)
+        if not results:
+            raise RuntimeError("Retrieval returned no results")
+        return results
+
+    retriever.search = checked_search
+    llm.generate = timer.wrap("generate", llm.generate)
+
+
+# --------------------------
+# Run One Request
+# --------------------------
+def run_request(query, llm, timer, arrival, request_id = None):
+    """
+    Answers one query with `llm.answer_query`, so the query cache and profiling hooks run
+    as they do in production, and reads the stage times from the instrumented calls.
+    A stage skipped by a cache hit takes 0 seconds.
+
+    Args:
+        query (str): The question.
+        llm: Object with a GPT4All-style `generate`, instrumented with `timer`.
+        timer (StageTimer): Timer the retriever and the LLM report to.
+        arrival (float): perf_counter time the request arrived, for queueing delay.
+        request_id (str): Tag for the profile report, if the request is profiled.
+
+    Returns:
+        dict: Seconds spent in each stage; "other" covers cache lookups and prompt building.
+    """
+    start = time.perf_counter()
+    timer.reset()
+    answer_query(query, llm, request_id = request_id)
+    done = time.perf_counter()
+
+    stages = timer.stages()
+    retrieve = stages.get("retrieve", 0.0)
+    generate = stages.get("generate", 0.0)
+    return {
+        "queue": start - arrival,
+        "retrieve": retrieve,
+        "generate": generate,
+        "other": done - start - retrieve - generate,
+        "total": done - arrival
+    }
+
+
+# --------------------------
+# Drive the Load
+# --------------------------
+def run_load(queries, llm, timer, requests = 200, concurrency = 8, rate = None, seed = 0):
+    """
+    Replays queries against the pipeline through `answer_query`.
+
+    With `rate`, requests arrive as a Poisson process at `rate` per second (open loop) and
+    wait for one of `concurrency` workers, so queueing delay grows once the arrival rate
+    exceeds capacity. Without it, `concurrency` users send requests back to back (closed loop).
+
+    Args:
+        queries (list of str): Queries to replay, in a loop.
+        llm: Object with a GPT4All-style `generate`, instrumented with `timer`.
+        timer (StageTimer): Timer the retriever and the LLM report to.
+        requests (int): Total number of requests.
+        concurrency (int): Number of workers / simulated users.
+        rate (float): Arrival rate in requests per second, or None for closed loop.
+        seed (int): Random seed for arrival times.
+
+    Returns:
+        tuple: (list of per-request stage timings, elapsed seconds, failed request count)
+    """
+    timings = []
+    failures = [0]
+    lock = threading.Lock()
+
+    def task(i, arrival):
+        query = queries[i % len(queries)]
+        try:
+            result = run_request(query, llm, timer, arrival, request_id = f"load-{i}")
+            with lock:
+                timings.append(result)
+        except Exception as e:
+            logger.error("Request for %r failed: %s", query, e)
+            with lock:
+                failures[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = concurrency) as pool:
+        if rate:
+            rng = random.Random(seed)
+            arrival = started
+            for i in range(requests):
+                arrival += rng.expovariate(rate)
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(task, i, arrival)
+        else:
+            counter = iter(range(requests))
+            counter_lock = threading.Lock()
+
+            def user():
+                while True:
+                    with counter_lock:
+                        i = next(counter, None)
+                    if i is None:
+                        return
+                    task(i, time.perf_counter())
+
+            for _ in range(concurrency):
+                pool.submit(user)
+
+    return timings, time.perf_counter() - started, failures[0]
+
+
+# --------------------------
+# Summarize Results
+# --------------------------
+def summarize(timings, elapsed, failures):
+    """
+    Computes throughput and per-stage latency percentiles in milliseconds.
+
+    Returns:
+        dict: {"requests", "failures", "elapsed_s", "throughput_rps", "stages": {stage: percentiles}}
+    """
+    report = {
+        "requests": len(timings),
+        "failures": failures,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(timings) / elapsed if elapsed else 0.0,
+        "stages": {}
+    }
+    for stage in ("queue", "retrieve", "generate", "other", "total"):
+        values = np.array([t[stage] for t in timings]) * 1000
+        if len(values) == 0:
+            continue
+        report["stages"][stage] = {
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95)),
+            "p99": float(np.percentile(values, 99)),
+            "max": float(values.max())
+        }
+    return report
+
+
+def print_report(report):
+    """
+    Prints the summary as a table.
+    """
+    print(f"Requests: {report['requests']} ok, {report['failures']} failed in {report['elapsed_s']:.1f}s "
+          f"-> {report['throughput_rps']:.2f} req/s")
+    print(f"{'stage':<10}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}   (ms)")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<10}" + "".join(f"{stats[key]:>10.1f}" for key in ("mean", "p50", "p95", "p99", "max")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Concurrent-user load test for the HogRAG query path.")
+    parser.add_argument("--queries", help = "File with one query per line (default: built-in lore questions)")
+    parser.add_argument("--requests", type = int, default = 200)
+    parser.add_argument("--concurrency", type = int, default = 8, help = "Workers / simulated users")
+    parser.add_argument("--rate", type = float, help = "Open-loop arrival rate in req/s (default: closed loop)")
+    parser.add_argument("--snapshot", action = "store_true", help = "Search the published index snapshot")
+    parser.add_argument("--real-encoder", action = "store_true", help = "Use the SentenceTransformer encoder")
+    parser.add_argument("--real-llm", action = "store_true", help = "Use the GPT4All model")
+    parser.add_argument("--encoder-delay", type = float, default = 0.02, help = "Stub encoder seconds per call")
+    parser.add_argument("--dim", type = int, default = 768, help = "Stub encoder dimensionality (synthetic index)")
+    parser.add_argument("--llm-token-delay", type = float, default = 0.005, help = "Stub LLM seconds per token")
+    parser.add_argument("--llm-tokens", type = int, default = 64, help = "Stub LLM tokens per answer")
+    parser.add_argument("--chunks", type = int, default = 20000, help = "Synthetic index size")
+    parser.add_argument("--output", help = "Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, "r", encoding = "utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = default_queries
+
+    if args.real_encoder:
+        from embedding import load_embedder
+        encoder = load_embedder()
+    else:
+        encoder = StubEncoder(args.dim, args.encoder_delay)
+
+    if args.real_llm:
+        from llm import load_llm
+        llm = load_llm()
+    else:
+        llm = StubLLM(args.llm_token_delay, args.llm_tokens)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.snapshot:
+            retriever = Retriever(model = encoder)
+            snapshot = retriever.current_snapshot()
+            if isinstance(encoder, StubEncoder) and snapshot is not None:
+                # The stub must produce vectors the query path accepts: the index dim, or the reducer's input dim
+                _, index, _, reducer = snapshot
+                if reducer is None:
+                    encoder.dim = index.d
+                elif reducer["method"] == "pca":
+                    encoder.dim = reducer["components"].shape[1]
+        else:
+            synthetic_snapshot(encoder, tmp, args.chunks)
+            retriever = Retriever(tmp, model = encoder)
+
+        try:
+            timer = StageTimer()
+            instrument(retriever, llm, timer)
+            set_retriever(retriever)
+            timings, elapsed, failures = run_load(queries, llm, timer, args.requests, args.concurrency, args.rate)
+        finally:
+            retriever.close()
+
+    report = summarize(timings, elapsed, failures)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding = "utf-8") as f:
+            json.dump(report, f, indent = 2)
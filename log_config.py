@@ -0,0 +1,155 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+
+# ---- Config ----
+log_file = os.environ.get("HOGRAG_LOG_FILE", "hograg.log")
+log_level = os.environ.get("HOGRAG_LOG_LEVEL", "INFO")
+# Per-logger overrides, e.g. "vector_db=WARNING,hograg.query=INFO"
+logger_levels = os.environ.get("HOGRAG_LOG_LEVELS", "")
+# Per-query lines: keep 1 in N of them, and at most this many per second
+query_log_every = int(os.environ.get("HOGRAG_QUERY_LOG_EVERY", "1") or 1)
+query_log_per_second = float(os.environ.get("HOGRAG_QUERY_LOG_PER_SECOND", "20") or 0)
+max_bytes = 10 * 1024 * 1024
+backup_count = 5
+log_format = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+# Logger for lines written once per query; sampled and rate-limited by QuerySampler
+query_logger = logging.getLogger("hograg.query")
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+# --------------------------
+# Sample Per-Query Log Lines
+# --------------------------
+class QuerySampler(logging.Filter):
+    """
+    Keeps 1 in `every` INFO-or-lower records and at most `per_second` of them per second.
+    Warnings and errors always pass.
+
+    Args:
+        every (int): Keep one record in this many.
+        per_second (float): Maximum records kept per second, or 0 for no limit.
+    """
+
+    def __init__(self, every = 1, per_second = 0):
+        super().__init__()
+        self.every = max(1, every)
+        self.per_second = per_second
+        self.suppressed = 0
+        self._count = 0
+        self._window = 0
+        self._in_window = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        with self._lock:
+            self._count += 1
+            if self._count % self.every:
+                self.suppressed += 1
+                return False
+            if self.per_second:
+                window = int(time.monotonic())
+                if window != self._window:
+                    self._window = window
+                    self._in_window = 0
+                if self._in_window >= self.per_second:
+                    self.suppressed += 1
+                    return False
+                self._in_window += 1
+        return True
+
+
+# --------------------------
+# Hand Records to the Listener
+# --------------------------
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread where that is safe. The stock
+    handler formats every message in the calling thread so records can be pickled; in-process
+    queues don't need that. Records whose arguments are all immutable (strings, numbers,
+    tuples of them) are enqueued as they are. Any other record is rendered here, so a mutable
+    argument is logged as it was at the call, not as it is when the listener gets to it.
+    Records carrying a traceback are also formatted up front, so the frames aren't kept alive
+    in the queue.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            return super().prepare(record)
+        if record.args and not _is_immutable(record.args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+def _is_immutable(value):
+    """
+    Checks whether a log argument (or tuple of arguments) can't change after the call.
+    """
+    if isinstance(value, tuple):
+        return all(_is_immutable(item) for item in value)
+    return isinstance(value, _IMMUTABLE_TYPES)
+
+
+# --------------------------
+# Configure Logging Once
+# --------------------------
+def setup_logging(level = None, file_path = None, levels = None):
+    """
+    Configures logging for the whole process; later calls are no-ops, so every module can
+    call it on import.
+
+    Loggers only put records on an in-memory queue; a background listener formats them and
+    writes them to a rotating log file and to stderr, so request threads never wait on disk.
+    Per-query lines go to `query_logger` and are sampled and rate-limited.
+
+    Args:
+        level (str or int): Root log level; defaults to HOGRAG_LOG_LEVEL.
+        file_path (str): Log file; defaults to HOGRAG_LOG_FILE.
+        levels (dict): Logger name -> level overrides; defaults to HOGRAG_LOG_LEVELS.
+
+    Returns:
+        logging.handlers.QueueListener: The running listener.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        formatter = logging.Formatter(log_format)
+        file_handler = logging.handlers.RotatingFileHandler(file_path or log_file, maxBytes = max_bytes,
+                                                            backupCount = backup_count, encoding = "utf-8")
+        stream_handler = logging.StreamHandler()
+        for handler in (file_handler, stream_handler):
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.setLevel(level or log_level)
+        root.addHandler(_DeferredQueueHandler(log_queue))
+
+        if levels is None:
+            levels = dict(item.split("=", 1) for item in logger_levels.split(",") if "=" in item)
+        for name, logger_level in levels.items():
+            logging.getLogger(name.strip()).setLevel(logger_level.strip().upper())
+
+        query_logger.addFilter(QuerySampler(query_log_every, query_log_per_second))
+
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler,
+                                                   respect_handler_level = True)
+        _listener.start()
+        # Drain the queue before the interpreter exits
+        atexit.register(_listener.stop)
+        return _listener
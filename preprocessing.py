@@ -1,5 +1,16 @@
 import re
 
+# ---- Config ----
+# Patterns are compiled once at import instead of on every call
+_FOOTNOTE_PATTERN = re.compile(r"\[\s*\d+\s*\]")
+# Only a heading on its own line starts a trailing section; the bare words
+# "notes" or "references" inside a sentence must not truncate the text
+_SECTION_PATTERN = re.compile(r"(?im)^[ \t]*(?:references|external links|see also|notes)[ \t]*$")
+_CHAPTER_PATTERN = re.compile(r"Chapter\s+\d+\s*:\s*")
+_EMPTY_BRACKETS_PATTERN = re.compile(r"\[\]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
 # -----------------------------
 # Clean Raw Text for Processing
 # -----------------------------
@@ -15,18 +26,20 @@ def clean_text(text):
         str: The cleaned and normalized text.
     """
     # remove footnotes like [1], [2], etc
-    text = re.sub(r"\[\s*\d+\s*\]", "", text)
+    text = _FOOTNOTE_PATTERN.sub("", text)
 
     # remove sections like 'References', 'External links', etc
-    text = re.split(r"(?i)references|external links|see also|notes", text)[0]
+    section = _SECTION_PATTERN.search(text)
+    if section:
+        text = text[:section.start()]
 
     # Remove non-breaking spaces and other unicode artifacts
     text = text.replace('\xa0', ' ').replace('\u200b', '')
 
-    text = re.sub(r"Chapter\s+\d+\s*:\s*", "", text)
-    text = re.sub(r"\[\]", "", text)
+    text = _CHAPTER_PATTERN.sub("", text)
+    text = _EMPTY_BRACKETS_PATTERN.sub("", text)
 
     # Normalize multiple spaces and newlines
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _WHITESPACE_PATTERN.sub(" ", text).strip()
 
-    return text
\ No newline at end of file
+    return text
@@ -0,0 +1,171 @@
+import cProfile
+import itertools
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from log_config import setup_logging
+
+
+# ---- Config ----
+# HOGRAG_PROFILE=1 profiles every request, N profiles 1 in N requests, unset/0 disables it
+profile_every = int(os.environ.get("HOGRAG_PROFILE", "0") or 0)
+profile_dir = os.environ.get("HOGRAG_PROFILE_DIR", "profiles")
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_request_counter = itertools.count()
+
+# tracemalloc is process-wide: the first active profile starts it and the last one stops it
+_tracing_lock = threading.Lock()
+_active_profiles = 0
+_started_tracing = False
+
+
+# --------------------------
+# Profile One Request
+# --------------------------
+class RequestProfile:
+    """
+    Context manager that runs one request under cProfile and tracemalloc, then writes
+    `<request_id>.prof` (pstats data) and `<request_id>.txt` (sorted stats, peak memory,
+    top allocation sites and annotations such as the prompt size) to the profile directory.
+
+    tracemalloc is process-wide, so the peak of two requests profiled at the same time
+    covers both of them; tracing starts with the first active profile and stops with the
+    last one. If cProfile can't be enabled because another profile holds it, the request
+    runs unprofiled. A failure while collecting or writing the report is logged and never
+    propagates to the request.
+
+    Args:
+        request_id (str): Tag for the output files.
+        output_dir (str): Directory to write the reports to.
+        top (int): Number of functions and allocation sites to list.
+    """
+
+    def __init__(self, request_id, output_dir = profile_dir, top = 30):
+        self.request_id = request_id
+        self.output_dir = output_dir
+        self.top = top
+        self.annotations = {}
+        self._profiler = cProfile.Profile()
+        self._active = False
+
+    def annotate(self, **values):
+        """
+        Records extra facts about the request (e.g. prompt_chars) in the report.
+        """
+        self.annotations.update(values)
+
+    def __enter__(self):
+        global _active_profiles, _started_tracing
+        # cProfile can refuse to start when another profiler is active (on Python 3.12+ it uses
+        # the process-wide sys.monitoring); the request then runs unprofiled
+        try:
+            self._profiler.enable()
+        except ValueError as e:
+            logger.warning(f"Not profiling request {self.request_id}: {e}")
+            self._active = False
+            return self
+
+        self._active = True
+        with _tracing_lock:
+            if _active_profiles == 0:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _started_tracing = True
+                # Only reset the peak when no other profile is measuring it
+                tracemalloc.reset_peak()
+            _active_profiles += 1
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active_profiles, _started_tracing
+        if not self._active:
+            return False
+        self._profiler.disable()
+        elapsed = time.perf_counter() - self._start
+
+        try:
+            _, peak = tracemalloc.get_traced_memory()
+            allocations = tracemalloc.take_snapshot().statistics("lineno")[:self.top]
+            self._write_report(elapsed, peak, allocations, exc)
+        except Exception as e:
+            logger.error(f"Failed to write profile for request {self.request_id}: {e}")
+        finally:
+            with _tracing_lock:
+                _active_profiles -= 1
+                if _active_profiles == 0 and _started_tracing:
+                    tracemalloc.stop()
+                    _started_tracing = False
+        return False
+
+    def _write_report(self, elapsed, peak, allocations, exc):
+        os.makedirs(self.output_dir, exist_ok = True)
+        base = os.path.join(self.output_dir, self.request_id)
+        self._profiler.dump_stats(base + ".prof")
+
+        with open(base + ".txt", "w", encoding = "utf-8") as f:
+            f.write(f"Request: {self.request_id}\n")
+            f.write(f"Wall time: {elapsed * 1000:.1f} ms\n")
+            f.write(f"Peak traced memory: {peak / 1e6:.2f} MB\n")
+            if exc is not None:
+                f.write(f"Failed with: {exc!r}\n")
+            for key, value in self.annotations.items():
+                f.write(f"{key}: {value}\n")
+
+            f.write("\n---- Top functions by cumulative time ----\n")
+            pstats.Stats(self._profiler, stream = f).sort_stats("cumulative").print_stats(self.top)
+
+            f.write("\n---- Top allocation sites ----\n")
+            for stat in allocations:
+                f.write(f"{stat}\n")
+
+        logger.info(f"Profiled request {self.request_id}: {elapsed * 1000:.1f} ms, "
+                    f"peak {peak / 1e6:.2f} MB, report at {base}.txt")
+
+
+class _NoProfile:
+    """
+    Stand-in used when a request is not profiled; every method is a no-op.
+    """
+
+    def annotate(self, **values):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_PROFILE = _NoProfile()
+
+
+# --------------------------
+# Decide Whether to Profile
+# --------------------------
+def profile_request(request_id = None, force = False):
+    """
+    Returns a profiling context for one request: a RequestProfile when the request is
+    forced or sampled (1 in HOGRAG_PROFILE requests), otherwise a shared no-op context,
+    so requests that are not profiled pay only for a counter increment.
+
+    Args:
+        request_id (str): Tag for the report files; a random one is generated if None.
+        force (bool): Profile this request regardless of sampling.
+
+    Returns:
+        RequestProfile or _NoProfile: Context manager with an `annotate` method.
+    """
+    if not force:
+        if profile_every <= 0 or next(_request_counter) % profile_every:
+            return _NO_PROFILE
+    request_id = request_id or time.strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+    return RequestProfile(request_id)
@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from log_config import setup_logging
+
+
+# ---- Config ----
+cache_path = "cache/query_cache.sqlite"
+query_log_path = "cache/query_log.jsonl"
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+_WHITESPACE = re.compile(r"\s+")
+_log_lock = threading.Lock()
+
+
+# --------------------------
+# Normalize a Query
+# --------------------------
+def normalize_query(query):
+    """
+    Normalizes a query for counting and cache lookups: lower-case, single spaces and no
+    trailing punctuation, so "Who is Harry Potter?" and "who is harry potter" share an entry.
+    """
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", query.strip().lower()))
+
+
+# --------------------------
+# Record and Rank Queries
+# --------------------------
+def record_query(query, log_path = query_log_path):
+    """
+    Appends a user query to the JSONL query log. Failures are logged and swallowed so the
+    log can never break a request.
+    """
+    try:
+        line = json.dumps({"ts": time.time(), "query": query}, ensure_ascii = False) + "\n"
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok = True)
+        with _log_lock, open(log_path, "a", encoding = "utf-8") as f:
+            f.write(line)
+    except Exception as e:
+        logger.error("Failed to record query: %s", e)
+
+
+def top_queries(n = 200, log_path = query_log_path, since = None):
+    """
+    Counts the normalized queries in the query log.
+
+    Args:
+        n (int): Number of queries to return.
+        log_path (str): Path to the JSONL query log.
+        since (float): Only count queries logged after this Unix time.
+
+    Returns:
+        list of tuple: (normalized query, count, most recent original spelling), most frequent first.
+    """
+    counts = Counter()
+    spelling = {}
+    if not os.path.exists(log_path):
+        return []
+
+    with open(log_path, "r", encoding = "utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by a crash
+            if since is not None and entry["ts"] < since:
+                continue
+            key = normalize_query(entry["query"])
+            if key:
+                counts[key] += 1
+                spelling[key] = entry["query"]
+
+    return [(key, count, spelling[key]) for key, count in counts.most_common(n)]
+
+
+# ------------------------------
+# Persistent Retrieval/Answer Store
+# ------------------------------
+class QueryCache:
+    """
+    SQLite store of precomputed retrieval results and answers, keyed by (index version,
+    normalized query). Entries are tied to the snapshot they were computed against, so
+    publishing a new index makes the old entries unreachable instead of stale.
+
+    The connection is shared between threads behind a lock; lookups are single indexed
+    reads.
+
+    Args:
+        path (str): Path to the SQLite file.
+    """
+
+    def __init__(self, path = cache_path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok = True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread = False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS retrievals (version TEXT, query TEXT, results TEXT, "
+                               "created REAL, PRIMARY KEY (version, query))")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS answers (version TEXT, query TEXT, answer TEXT, "
+                               "created REAL, PRIMARY KEY (version, query))")
+
+    def get_retrieval(self, version, query):
+        """
+        Returns the cached context chunks for a query, or None.
+        """
+        row = self._get("SELECT results FROM retrievals WHERE version = ? AND query = ?", version, query)
+        return json.loads(row[0]) if row else None
+
+    def get_answer(self, version, query):
+        """
+        Returns the cached answer for a query, or None.
+        """
+        row = self._get("SELECT answer FROM answers WHERE version = ? AND query = ?", version, query)
+        return row[0] if row else None
+
+    def put_retrieval(self, version, query, results):
+        self._put("INSERT OR REPLACE INTO retrievals VALUES (?, ?, ?, ?)",
+                  version, normalize_query(query), json.dumps(results, ensure_ascii = False), time.time())
+
+    def put_answer(self, version, query, answer):
+        self._put("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+                  version, normalize_query(query), answer, time.time())
+
+    def prune(self, keep_version):
+        """
+        Deletes the entries of every index version except `keep_version`.
+
+        Returns:
+            int: Number of rows removed.
+        """
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM retrievals WHERE version != ?", (keep_version,)).rowcount
+            removed += self._conn.execute("DELETE FROM answers WHERE version != ?", (keep_version,)).rowcount
+        logger.info("Pruned %d cache entries of old index versions", removed)
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _get(self, sql, version, query):
+        with self._lock:
+            return self._conn.execute(sql, (version, normalize_query(query))).fetchone()
+
+    def _put(self, sql, *values):
+        with self._lock, self._conn:
+            self._conn.execute(sql, values)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_query_cache():
+    """
+    Returns the process-wide QueryCache, opening it on first use.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QueryCache()
+    return _cache
@@ -0,0 +1,177 @@
+import logging
+import os
+import time
+import numpy as np
+from log_config import setup_logging
+
+
+# ---- Config ----
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+# --------------------------
+# Fit a Reduction Transform
+# --------------------------
+def fit_reducer(embeddings, dim, method = "pca", max_samples = 50000, seed = 0):
+    """
+    Fits a transform that maps embeddings to `dim` dimensions.
+
+    "pca" projects onto the top principal components of (a sample of) the embeddings;
+    "truncate" keeps the first `dim` coordinates, Matryoshka style. Both renormalize the
+    result so inner products stay cosine similarities.
+
+    Args:
+        embeddings (np.ndarray): Embedding matrix to fit on.
+        dim (int): Target dimensionality.
+        method (str): "pca" or "truncate".
+        max_samples (int): Maximum number of rows used to fit the PCA.
+        seed (int): Random seed for sampling rows.
+
+    Returns:
+        dict: The reducer, with "method", "dim" and for PCA "mean" and "components".
+
+    Raises:
+        ValueError: If the method is unknown or dim is not smaller than the input dimension.
+    """
+    if dim >= embeddings.shape[1]:
+        raise ValueError(f"Target dimension {dim} must be smaller than {embeddings.shape[1]}")
+
+    if method == "truncate":
+        return {"method": method, "dim": dim}
+    if method != "pca":
+        raise ValueError(f"Unknown reduction method: {method}")
+
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(embeddings), size = min(len(embeddings), max_samples), replace = False)
+    sample = np.asarray(embeddings[np.sort(rows)], dtype = np.float32)
+
+    mean = sample.mean(axis = 0)
+    _, singular_values, vt = np.linalg.svd(sample - mean, full_matrices = False)
+    variance = singular_values ** 2
+    kept = variance[:dim].sum() / variance.sum()
+    logger.info(f"PCA to {dim} dimensions keeps {kept * 100:.1f}% of the variance")
+
+    return {"method": method, "dim": dim, "mean": mean, "components": vt[:dim].astype(np.float32)}
+
+
+# --------------------------
+# Apply a Reduction Transform
+# --------------------------
+def apply_reducer(vectors, reducer):
+    """
+    Reduces vectors with a fitted reducer and renormalizes them to unit length.
+
+    Args:
+        vectors (np.ndarray): Vectors of the original dimensionality.
+        reducer (dict): Reducer from `fit_reducer` or `load_reducer`.
+
+    Returns:
+        np.ndarray: Reduced float32 vectors.
+    """
+    if reducer["method"] == "truncate":
+        reduced = np.array(vectors[:, :reducer["dim"]], dtype = np.float32)
+    else:
+        reduced = ((vectors - reducer["mean"]) @ reducer["components"].T).astype(np.float32)
+
+    norms = np.linalg.norm(reduced, axis = 1, keepdims = True)
+    return reduced / np.maximum(norms, 1e-12)
+
+
+# --------------------------
+# Save and Load a Reducer
+# --------------------------
+def save_reducer(reducer, output_folder = "embeddings"):
+    """
+    Saves a reducer to reducer.npz next to the embeddings it produced.
+    """
+    os.makedirs(output_folder, exist_ok = True)
+    np.savez(f"{output_folder}/reducer.npz", **reducer)
+    logger.info(f"Saved {reducer['method']} reducer to {reducer['dim']} dimensions in {output_folder}")
+
+
+def load_reducer(folder_path):
+    """
+    Loads the reducer saved in a folder, if it belongs to the embeddings saved there.
+
+    A reducer whose output dimension doesn't match embedding.npy was left behind by an
+    earlier build; it is ignored with a warning, so queries are never projected into a
+    space the index wasn't built in.
+
+    Returns:
+        dict or None: The reducer, or None if the embeddings were not reduced.
+    """
+    path = f"{folder_path}/reducer.npz"
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        reducer = {key: data[key] for key in data.files}
+    reducer["method"] = str(reducer["method"])
+    reducer["dim"] = int(reducer["dim"])
+
+    embedding_path = f"{folder_path}/embedding.npy"
+    if os.path.exists(embedding_path):
+        embedding_dim = np.load(embedding_path, mmap_mode = "r").shape[1]
+        if embedding_dim != reducer["dim"]:
+            logger.warning(f"Ignoring stale reducer in {folder_path}: it outputs {reducer['dim']} dims "
+                           f"but the embeddings have {embedding_dim}")
+            return None
+    return reducer
+
+
+def remove_reducer(output_folder = "embeddings"):
+    """
+    Deletes a reducer left in the folder by an earlier build, for builds that don't reduce.
+    """
+    path = f"{output_folder}/reducer.npz"
+    if os.path.exists(path):
+        os.remove(path)
+        logger.info(f"Removed stale reducer from {output_folder}")
+
+
+# --------------------------------
+# Report Recall and Cost of Reduction
+# --------------------------------
+def reduction_report(full, reduced, k = 5, num_queries = 200, seed = 0):
+    """
+    Compares exact top-k search over reduced vectors against the full vectors, using
+    chunks as pseudo-queries, and reports the recall loss next to memory and search time.
+
+    Args:
+        full (np.ndarray): Full-dimensional, normalized embeddings.
+        reduced (np.ndarray): The same embeddings after `apply_reducer`.
+        k (int): Number of neighbours.
+        num_queries (int): Number of pseudo-queries.
+        seed (int): Random seed for picking queries.
+
+    Returns:
+        dict: recall@k, memory in bytes and ms/query for both representations.
+    """
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(full), size = min(len(full), num_queries), replace = False)
+
+    def top_k(matrix):
+        start = time.perf_counter()
+        neighbours = []
+        for q in queries:
+            # Skip the query's own row, it would always be the first hit
+            scores = matrix @ matrix[q]
+            scores[q] = -np.inf
+            neighbours.append(np.argpartition(-scores, k)[:k])
+        return neighbours, (time.perf_counter() - start) * 1000 / len(queries)
+
+    truth, full_ms = top_k(np.asarray(full, dtype = np.float32))
+    found, reduced_ms = top_k(reduced)
+    recall = np.mean([len(np.intersect1d(t, f)) / k for t, f in zip(truth, found)])
+
+    report = {
+        "recall": float(recall),
+        "full_bytes": int(full.shape[0] * full.shape[1] * 4),
+        "reduced_bytes": int(reduced.nbytes),
+        "full_ms": full_ms,
+        "reduced_ms": reduced_ms
+    }
+    logger.info(f"Reduction {full.shape[1]} -> {reduced.shape[1]} dims: recall@{k}={recall:.3f}, "
+                f"memory {report['full_bytes'] / 1e6:.1f}MB -> {report['reduced_bytes'] / 1e6:.1f}MB, "
+                f"search {full_ms:.3f}ms -> {reduced_ms:.3f}ms per query")
+    return report
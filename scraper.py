@@ -1,18 +1,15 @@
 import requests
 from bs4 import BeautifulSoup
 import logging
-from utils import save_to_file
+from urllib.parse import unquote, urljoin
+from utils import save_to_file, record_source
+from log_config import setup_logging
 
 # ---- Config ----
 file_path = "/Users/trishika/Documents/My Projects/[1] HogRAG/urls.txt"
 
-logging.basicConfig(
-    level = logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("hograg.log"),
-        logging.StreamHandler()]
-)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 # --------------------
@@ -31,12 +28,12 @@ def read_urls_from_file(file_path):
     try:
         with open(file_path, 'r') as file:
             urls = [line.strip() for line in file if line.strip()]
-            logging.info(f"Successfully read {len(urls)} URLs from: {file_path}")
+            logger.info(f"Successfully read {len(urls)} URLs from: {file_path}")
             return urls
     except FileNotFoundError:
-        logging.error(f"File Not Found: {file_path}")
+        logger.error(f"File Not Found: {file_path}")
     except:
-        logging.error(f"Unexpected error while handling file: {file_path}")
+        logger.error(f"Unexpected error while handling file: {file_path}")
     return []
 
 
@@ -57,20 +54,21 @@ def scrape_urls(url_list):
     success_count = 0  # ADDED: Track how many URLs were successfully scraped
     for url in url_list:
         try:
-            logging.info(f"Scrapping URL: {url}")
-            content = scrape_content(url)
+            logger.info(f"Scrapping URL: {url}")
+            page = scrape_page(url)
 
-            if content: # ADDED: Check for non-empty content
-                save_to_file(content)
-                logging.info(f"Successfully scraped and saved: {url}")
+            if page and page["text"]: # ADDED: Check for non-empty content
+                file_name = save_to_file(page["text"])
+                record_source(file_name, url, page["title"], page["sections"])
+                logger.info(f"Successfully scraped and saved: {url}")
                 success_count += 1
             else:
-                logging.warning(f"No content extracted from: {url}")
+                logger.warning(f"No content extracted from: {url}")
                 
         except Exception as e:
-            logging.exception(f"Failed to scrape: {url}")
+            logger.exception(f"Failed to scrape: {url}")
     
-    logging.info(f"Scraped {success_count} pages out of {len(url_list)} URLS")
+    logger.info(f"Scraped {success_count} pages out of {len(url_list)} URLS")
 
 # -----------------------------------
 # Extract Main Content from a Web Page
@@ -85,40 +83,138 @@ def scrape_content(URL):
     Returns:
         str: Extracted plain text content, or empty string on failure.
     """
+    page = scrape_page(URL)
+    return page["text"] if page else ""
+
+
+# ------------------------------------------
+# Extract Content and Metadata from a Web Page
+# ------------------------------------------
+def scrape_page(URL):
+    """
+    Fetches a Wikipedia-like web page and extracts its main text together with the
+    page title and the character offset where each section starts in that text.
+
+    Args:
+        URL (str): The URL to scrape.
+
+    Returns:
+        dict or None: {"text": str, "title": str, "sections": list of [offset, heading],
+        "links": list of absolute URLs linked from the main content}, or None on failure.
+    """
     try:
         response = requests.get(URL, timeout = 10)
         response.raise_for_status()
-        logging.info(f"Fetched content from: {URL}")
+        logger.info(f"Fetched content from: {URL}")
 
         soup = BeautifulSoup(response.text, "html.parser")
         main_content = soup.find("div",{"class": "mw-content-ltr mw-parser-output"})
 
         if not main_content:
-            logging.warning(f"Main content not found in {URL}")
-            return ""
-            
-        all_tags = main_content.find_all(["p"])
-
-        # Exclude <p> tags with class "caption"- those are text under images 
-        filtered_tags = [
-            tag for tag in all_tags 
-            if not(tag.name == "p" and "caption" in tag.get("class", []))]
-
-        page_text = " ".join(tag.get_text(strip = True, separator = " ") 
-                for tag in filtered_tags if tag.get_text(strip = True))
-        logging.info(f"Extracted text content length: {len(page_text)} characters from {URL}")
-        return page_text
-    
+            logger.warning(f"Main content not found in {URL}")
+            return None
+
+        heading = soup.find(id = "firstHeading")
+        title = heading.get_text(strip = True) if heading else page_title_from_url(URL)
+
+        page_text, sections = extract_sections(main_content)
+        logger.info(f"Extracted text content length: {len(page_text)} characters from {URL}")
+        links = extract_links(main_content, URL)
+        return {"text": page_text, "title": title, "sections": sections, "links": links}
+
     except requests.Timeout:
-        logging.error(f"Request to {URL} timed out.")
+        logger.error(f"Request to {URL} timed out.")
     except requests.ConnectionError:
-        logging.error(f"Connection error occurred while requesting {URL}.")
+        logger.error(f"Connection error occurred while requesting {URL}.")
     except requests.HTTPError as http_err:
-        logging.error(f"HTTP error occurred for {URL}: {http_err}")
+        logger.error(f"HTTP error occurred for {URL}: {http_err}")
     except Exception as e:
-        logging.error(f"An unexpected error occurred while scraping: {e}")
+        logger.error(f"An unexpected error occurred while scraping: {e}")
+
+    return None
+
+
+# ---------------------------------
+# Join Paragraphs and Track Sections
+# ---------------------------------
+def extract_sections(main_content):
+    """
+    Joins the paragraph text of a page and records where each section heading's
+    paragraphs begin in the joined text.
+
+    Args:
+        main_content (bs4.Tag): The page's main content div.
 
-    return ""
+    Returns:
+        tuple: (page_text, sections) where sections is a list of [offset, heading].
+    """
+    all_tags = main_content.find_all(["h2", "h3", "p"])
+
+    parts = []
+    sections = []
+    offset = 0
+    current_heading = None
+    for tag in all_tags:
+        if tag.name in ("h2", "h3"):
+            headline = tag.find(class_ = "mw-headline") or tag
+            current_heading = headline.get_text(strip = True)
+            continue
+
+        # Exclude <p> tags with class "caption"- those are text under images
+        if "caption" in tag.get("class", []):
+            continue
+
+        text = tag.get_text(strip = True, separator = " ")
+        if not text:
+            continue
+
+        if current_heading is not None:
+            sections.append([offset, current_heading])
+            current_heading = None
+
+        parts.append(text)
+        offset += len(text) + 1
+
+    return " ".join(parts), sections
+
+
+# --------------------------------
+# Collect Links from the Main Content
+# --------------------------------
+def extract_links(main_content, base_url):
+    """
+    Collects the links in a page's main content, resolved against the page URL, in
+    document order and without repeats. Navigation, sidebars and footers are outside the
+    content div, so their links are not followed.
+
+    Args:
+        main_content (bs4.Tag): The page's main content div.
+        base_url (str): URL of the page, for resolving relative links.
+
+    Returns:
+        list of str: Absolute URLs.
+    """
+    links = []
+    seen = set()
+    for anchor in main_content.find_all("a", href = True):
+        href = anchor["href"]
+        if href.startswith("#"):
+            continue
+        url = urljoin(base_url, href)
+        if url not in seen:
+            seen.add(url)
+            links.append(url)
+    return links
+
+
+# --------------------------
+# Derive Page Title from URL
+# --------------------------
+def page_title_from_url(URL):
+    """
+    Turns a wiki URL such as .../wiki/Harry_Potter into the page title "Harry Potter".
+    """
+    return unquote(URL.rstrip("/").rsplit("/", 1)[-1]).replace("_", " ")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+import faiss
+from embedding import load_embeddings
+from reduction import load_reducer
+from log_config import setup_logging
+
+
+# ---- Config ----
+snapshot_root = "index_store"
+index_file_name = "faiss_index.index"
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+# --------------------------
+# Publish a New Snapshot
+# --------------------------
+def publish_snapshot(index, embeddings_folder = "embeddings", root = snapshot_root):
+    """
+    Publishes a FAISS index and the embedding folder it was built from as a new,
+    immutable snapshot, then atomically points CURRENT at it.
+
+    The snapshot is assembled in a hidden staging directory, renamed into place and only
+    then made current, so a reader never sees a half-written snapshot or an index that
+    doesn't match its chunks.
+
+    Args:
+        index (faiss.Index): The built index.
+        embeddings_folder (str): Folder with embedding.npy and the chunk files.
+        root (str): Root directory of the snapshot store.
+
+    Returns:
+        str: The new snapshot version.
+
+    Raises:
+        ValueError: If the embedding folder can't be loaded, or the index and the chunks don't
+            have the same number of entries.
+    """
+    loaded = load_embeddings(embeddings_folder)
+    if loaded is None:
+        raise ValueError(f"Could not load the embeddings and chunks in {embeddings_folder}; see the error above")
+    _, chunks = loaded
+    if index.ntotal != len(chunks):
+        raise ValueError(f"Index has {index.ntotal} vectors but there are {len(chunks)} chunks")
+
+    # Versions sort chronologically; the random suffix keeps concurrent builders apart
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f") + "-" + uuid.uuid4().hex[:6]
+    snapshots_dir = os.path.join(root, "snapshots")
+    staging = os.path.join(snapshots_dir, f".tmp-{version}")
+    os.makedirs(staging)
+
+    try:
+        for file_name in os.listdir(embeddings_folder):
+            source = os.path.join(embeddings_folder, file_name)
+            if os.path.isfile(source):
+                shutil.copy2(source, staging)
+        faiss.write_index(index, os.path.join(staging, index_file_name))
+
+        # An on-disk index only references its lists file, so copy that file alongside it
+        ivfdata = None
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            invlists = faiss.downcast_InvertedLists(ivf.invlists)
+            if isinstance(invlists, faiss.OnDiskInvertedLists):
+                ivfdata = os.path.basename(invlists.filename)
+                shutil.copy2(invlists.filename, os.path.join(staging, ivfdata))
+
+        manifest = {
+            "version": version,
+            "created": time.time(),
+            "num_vectors": int(index.ntotal),
+            "num_chunks": len(chunks),
+            "dim": int(index.d),
+            "ivfdata": ivfdata,
+            "files": {f: os.path.getsize(os.path.join(staging, f)) for f in sorted(os.listdir(staging))}
+        }
+        with open(os.path.join(staging, "manifest.json"), "w", encoding = "utf-8") as f:
+            json.dump(manifest, f, indent = 2)
+
+        os.rename(staging, os.path.join(snapshots_dir, version))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors = True)
+        raise
+
+    _write_atomic(os.path.join(root, "CURRENT"), version)
+    logger.info(f"Published snapshot {version} with {index.ntotal} vectors")
+    return version
+
+
+# --------------------------
+# Read the Current Version
+# --------------------------
+def current_version(root = snapshot_root):
+    """
+    Returns the version CURRENT points at, or None if nothing has been published.
+    """
+    try:
+        with open(os.path.join(root, "CURRENT"), "r", encoding = "utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# --------------------------
+# Load a Snapshot
+# --------------------------
+def load_snapshot(version, root = snapshot_root, on_disk = False):
+    """
+    Loads the index, chunks and query reducer (if the embeddings were reduced) of a snapshot
+    and checks them against its manifest. The embeddings are only memory-mapped for the
+    consistency check.
+
+    Args:
+        version (str): The snapshot version to load.
+        root (str): Root directory of the snapshot store.
+        on_disk (bool): Page the index from disk: on-disk inverted lists are opened from the
+            snapshot directory, other indexes are memory-mapped.
+
+    Returns:
+        tuple: (manifest, index, chunks, reducer); reducer is None for full-dimensional snapshots.
+
+    Raises:
+        ValueError: If the index, chunks, reducer and manifest disagree.
+    """
+    path = snapshot_path(version, root)
+    with open(os.path.join(path, "manifest.json"), "r", encoding = "utf-8") as f:
+        manifest = json.load(f)
+
+    io_flags = 0
+    if manifest.get("ivfdata"):
+        # Always needed: the lists file was copied here from wherever the index was built
+        io_flags = faiss.IO_FLAG_ONDISK_SAME_DIR
+    elif on_disk:
+        io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+
+    index = faiss.read_index(os.path.join(path, index_file_name), io_flags)
+    embeddings, chunks = load_embeddings(path, mmap = True)
+    del embeddings
+    reducer = load_reducer(path)
+
+    if not (index.ntotal == len(chunks) == manifest["num_vectors"]):
+        raise ValueError(f"Snapshot {version} is inconsistent: index {index.ntotal}, chunks {len(chunks)}, "
+                         f"manifest {manifest['num_vectors']}")
+    if reducer is not None and reducer["dim"] != index.d:
+        raise ValueError(f"Snapshot {version} reducer outputs {reducer['dim']} dims but the index has {index.d}")
+
+    logger.info(f"Loaded snapshot {version}")
+    return manifest, index, chunks, reducer
+
+
+def snapshot_path(version, root = snapshot_root):
+    """
+    Returns the directory of a snapshot version.
+    """
+    return os.path.join(root, "snapshots", version)
+
+
+# --------------------------
+# Garbage-Collect Snapshots
+# --------------------------
+def gc_snapshots(root = snapshot_root, keep = 3, min_age = 600):
+    """
+    Deletes old snapshots. The current snapshot and the `keep` newest ones are always kept,
+    and nothing younger than `min_age` seconds is removed so processes that are still
+    swapping to a recent version are not pulled out from under. Abandoned staging
+    directories are removed with the same age rule.
+
+    Args:
+        root (str): Root directory of the snapshot store.
+        keep (int): Number of most recent snapshots to keep.
+        min_age (float): Minimum age in seconds before a snapshot can be removed.
+
+    Returns:
+        list of str: The removed snapshot directories.
+    """
+    snapshots_dir = os.path.join(root, "snapshots")
+    if not os.path.isdir(snapshots_dir):
+        return []
+
+    current = current_version(root)
+    versions = sorted((v for v in os.listdir(snapshots_dir) if not v.startswith(".")), reverse = True)
+    candidates = versions[keep:] + [v for v in os.listdir(snapshots_dir) if v.startswith(".tmp-")]
+
+    removed = []
+    now = time.time()
+    for version in candidates:
+        path = os.path.join(snapshots_dir, version)
+        if version == current or now - os.path.getmtime(path) < min_age:
+            continue
+        try:
+            shutil.rmtree(path)
+            removed.append(version)
+        except Exception as e:
+            logger.error(f"Failed to remove snapshot {version}: {e}")
+
+    if removed:
+        logger.info(f"Garbage-collected {len(removed)} snapshots: {removed}")
+    return removed
+
+
+def schedule_gc(root = snapshot_root, interval = 3600, keep = 3, min_age = 600):
+    """
+    Runs `gc_snapshots` every `interval` seconds on a daemon thread.
+
+    Returns:
+        threading.Event: Set it to stop the schedule.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                gc_snapshots(root, keep, min_age)
+            except Exception as e:
+                logger.error(f"Scheduled snapshot GC failed: {e}")
+
+    threading.Thread(target = run, name = "snapshot-gc", daemon = True).start()
+    return stop
+
+
+def _write_atomic(path, content):
+    """
+    Writes a small file by writing a temporary file next to it and renaming it over the target.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding = "utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,240 @@
+import argparse
+import json
+import logging
+import os
+import time
+import faiss
+import numpy as np
+from log_config import setup_logging
+
+
+# ---- Config ----
+faiss.omp_set_num_threads(1)
+folder_path = "embeddings"
+config_path = "faiss/index_config.json"
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+# --------------------------
+# Split Pseudo-Queries
+# --------------------------
+def split_queries(embeddings, num_queries = 200, seed = 0):
+    """
+    Holds out a random sample of chunk embeddings to use as pseudo-queries.
+
+    Args:
+        embeddings (np.ndarray): All chunk embeddings.
+        num_queries (int): Number of pseudo-queries to hold out.
+        seed (int): Random seed, so sweeps are comparable between runs.
+
+    Returns:
+        tuple: (database, queries) as contiguous float32 arrays.
+
+    Raises:
+        ValueError: If there are fewer than two embeddings to split.
+    """
+    if len(embeddings) < 2:
+        raise ValueError(f"Need at least 2 embeddings to tune an index, got {len(embeddings)}")
+    rng = np.random.default_rng(seed)
+    num_queries = max(1, min(num_queries, len(embeddings) // 10))
+    order = rng.permutation(len(embeddings))
+    queries = np.ascontiguousarray(embeddings[order[:num_queries]], dtype = np.float32)
+    database = np.ascontiguousarray(embeddings[np.sort(order[num_queries:])], dtype = np.float32)
+    return database, queries
+
+
+# --------------------------
+# Candidate Configurations
+# --------------------------
+def candidate_configs(num_vectors, dim):
+    """
+    Lists the index configurations to sweep, sized to the corpus.
+
+    Args:
+        num_vectors (int): Number of database vectors.
+        dim (int): Vector dimensionality.
+
+    Returns:
+        list of dict: {"factory": str, "search_params": dict} entries.
+    """
+    configs = [{"factory": "Flat", "search_params": {}}]
+
+    # IVF needs roughly 39 training points per list
+    base = max(1, int(np.sqrt(num_vectors)))
+    nlists = sorted({n for n in (base, 4 * base) if 1 < n <= num_vectors // 39})
+    for nlist in nlists:
+        for nprobe in (1, 2, 4, 8, 16, 32, 64):
+            if nprobe <= nlist:
+                configs.append({"factory": f"IVF{nlist},Flat", "search_params": {"nprobe": nprobe}})
+
+    for m in (16, 32):
+        for ef in (16, 32, 64, 128):
+            configs.append({"factory": f"HNSW{m}", "search_params": {"efSearch": ef}})
+
+    # 8-bit PQ codebooks need a few thousand training points
+    if nlists and num_vectors >= 2560:
+        nlist = nlists[0]
+        for m in (dim // 16, dim // 8):
+            if m > 0 and dim % m == 0:
+                for nprobe in (4, 16, 64):
+                    if nprobe <= nlist:
+                        configs.append({"factory": f"IVF{nlist},PQ{m}", "search_params": {"nprobe": nprobe}})
+    return configs
+
+
+# --------------------------
+# Build and Measure One Index
+# --------------------------
+def measure(config, database, queries, ground_truth, k, cache):
+    """
+    Builds (or reuses) the index for a configuration and measures recall@k, per-query
+    latency and serialized size.
+
+    Args:
+        config (dict): {"factory", "search_params"} entry.
+        database (np.ndarray): Database vectors.
+        queries (np.ndarray): Pseudo-query vectors.
+        ground_truth (np.ndarray): Exact top-k ids for each query.
+        k (int): Number of neighbours.
+        cache (dict): Built indexes keyed by factory string, shared across search params.
+
+    Returns:
+        dict: The configuration with its measurements.
+    """
+    factory = config["factory"]
+    if factory not in cache:
+        start = time.perf_counter()
+        index = faiss.index_factory(database.shape[1], factory)
+        if not index.is_trained:
+            index.train(database)
+        index.add(database)
+        cache[factory] = (index, time.perf_counter() - start, len(faiss.serialize_index(index)))
+    index, build_seconds, memory_bytes = cache[factory]
+
+    space = faiss.ParameterSpace()
+    for name, value in config["search_params"].items():
+        space.set_index_parameter(index, name, value)
+
+    # One query at a time, the way semantic_search calls the index
+    latencies = np.empty(len(queries))
+    found = np.empty((len(queries), k), dtype = np.int64)
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, I = index.search(queries[i:i + 1], k)
+        latencies[i] = time.perf_counter() - start
+        found[i] = I[0]
+
+    hits = sum(len(np.intersect1d(found[i], ground_truth[i])) for i in range(len(queries)))
+    return dict(config,
+                recall = hits / (len(queries) * k),
+                p50_ms = float(np.percentile(latencies, 50) * 1000),
+                p99_ms = float(np.percentile(latencies, 99) * 1000),
+                memory_bytes = memory_bytes,
+                build_seconds = build_seconds)
+
+
+# --------------------------
+# Pareto Frontier
+# --------------------------
+def pareto_front(results):
+    """
+    Keeps the results not dominated on (higher recall, lower p99 latency, lower memory).
+    """
+    def dominates(a, b):
+        no_worse = a["recall"] >= b["recall"] and a["p99_ms"] <= b["p99_ms"] and a["memory_bytes"] <= b["memory_bytes"]
+        better = a["recall"] > b["recall"] or a["p99_ms"] < b["p99_ms"] or a["memory_bytes"] < b["memory_bytes"]
+        return no_worse and better
+
+    front = [r for r in results if not any(dominates(other, r) for other in results)]
+    return sorted(front, key = lambda r: r["p99_ms"])
+
+
+def choose_config(front, target_recall):
+    """
+    Picks the fastest Pareto-optimal configuration that reaches the target recall,
+    or the most accurate one if none does.
+    """
+    eligible = [r for r in front if r["recall"] >= target_recall]
+    if eligible:
+        return min(eligible, key = lambda r: (r["p99_ms"], r["memory_bytes"]))
+    return max(front, key = lambda r: r["recall"])
+
+
+# --------------------------
+# Run the Full Sweep
+# --------------------------
+def tune(embeddings, k = 5, num_queries = 200, target_recall = 0.95, output_path = config_path):
+    """
+    Sweeps index configurations against exact flat search and writes the chosen
+    Pareto-optimal configuration for `build_faiss_index` to use.
+
+    Args:
+        embeddings (np.ndarray): Chunk embeddings from the embeddings folder.
+        k (int): Number of neighbours to measure recall at.
+        num_queries (int): Number of held-out pseudo-queries.
+        target_recall (float): Minimum recall@k for the chosen configuration.
+        output_path (str): Where to write the chosen configuration.
+
+    Returns:
+        dict: The written configuration, including the full Pareto frontier.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype = np.float32)
+    faiss.normalize_L2(embeddings)
+    database, queries = split_queries(embeddings, num_queries)
+    logger.info(f"Tuning on {len(database)} vectors with {len(queries)} held-out queries, k={k}")
+
+    # Exact ground truth from the current flat index type
+    exact = faiss.IndexFlatL2(database.shape[1])
+    exact.add(database)
+    _, ground_truth = exact.search(queries, k)
+
+    cache = {}
+    results = []
+    for config in candidate_configs(len(database), database.shape[1]):
+        try:
+            result = measure(config, database, queries, ground_truth, k, cache)
+        except Exception as e:
+            logger.error(f"Skipping {config['factory']} {config['search_params']}: {e}")
+            continue
+        results.append(result)
+        logger.info(f"{result['factory']:<18} {str(result['search_params']):<20} recall@{k}={result['recall']:.3f} "
+                    f"p50={result['p50_ms']:.3f}ms p99={result['p99_ms']:.3f}ms mem={result['memory_bytes'] / 1e6:.1f}MB")
+
+    front = pareto_front(results)
+    chosen = choose_config(front, target_recall)
+
+    config = {
+        "factory": chosen["factory"],
+        "search_params": chosen["search_params"],
+        "k": k,
+        "target_recall": target_recall,
+        "recall": chosen["recall"],
+        "p50_ms": chosen["p50_ms"],
+        "p99_ms": chosen["p99_ms"],
+        "memory_bytes": chosen["memory_bytes"],
+        "num_vectors": len(embeddings),
+        "dim": embeddings.shape[1],
+        "pareto": front
+    }
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok = True)
+    with open(output_path, "w", encoding = "utf-8") as f:
+        json.dump(config, f, indent = 2)
+    logger.info(f"Chose {chosen['factory']} {chosen['search_params']} (recall@{k}={chosen['recall']:.3f}, "
+                f"p99={chosen['p99_ms']:.3f}ms); wrote {output_path}")
+    return config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Tune FAISS index parameters against exact search.")
+    parser.add_argument("--embeddings", default = folder_path, help = "Folder containing embedding.npy")
+    parser.add_argument("--k", type = int, default = 5)
+    parser.add_argument("--queries", type = int, default = 200)
+    parser.add_argument("--target-recall", type = float, default = 0.95)
+    parser.add_argument("--output", default = config_path)
+    args = parser.parse_args()
+
+    embeddings = np.load(os.path.join(args.embeddings, "embedding.npy"))
+    tune(embeddings, args.k, args.queries, args.target_recall, args.output)
@@ -1,8 +1,8 @@
 import streamlit as st
 import base64
 import os
-from vector_db import retrieve_context
-from llm import build_prompt, load_llm
+from llm import answer_query, load_llm
+from query_cache import record_query
 
 # -------------------------------------
 # Convert Image to Base64 for Background
@@ -115,6 +115,7 @@ def main():
     with col1:
         if st.button("Submit"):
             st.session_state.submitted = True
+            st.session_state.record_query = True
     
     def clear():
         st.session_state.user_query = ""
@@ -129,10 +130,13 @@ def main():
     if st.session_state.submitted and st.session_state.user_query.strip():
         
         with st.spinner("Processing your magical question..."):
-            context_chunks = retrieve_context(st.session_state.user_query)
-            prompt = build_prompt([chunk["text"] for chunk in context_chunks], st.session_state.user_query)
-            llm = get_model()
-            response = llm.generate(prompt, max_tokens=512, temp=0.7)
+            # Add ?profile=1 to the URL to profile this request
+            profile = st.query_params.get("profile") == "1"
+            # Feeds the cache warmer's top-N queries; only the Submit click counts, not later reruns
+            if st.session_state.get("record_query"):
+                record_query(st.session_state.user_query)
+                st.session_state.record_query = False
+            response = answer_query(st.session_state.user_query, get_model(), profile = profile)
                 
         st.subheader("📖 Answer:")
         st.write(response)
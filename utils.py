@@ -1,14 +1,11 @@
 import logging
+import json
 import os
+from log_config import setup_logging
 
 # ---- Config ----
-logging.basicConfig(
-    level = logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("hograg.log"),
-        logging.StreamHandler()]
-)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 # --------------------------
@@ -27,13 +24,13 @@ def read_from_file(file_path):
     try:
         with open(file_path, "r", encoding = "utf-8") as f:
             file_content = f.read()
-        logging.info(f"Successfully read file contents: {file_path}")
+        logger.info(f"Successfully read file contents: {file_path}")
         return file_content
     
     except FileNotFoundError:
-        logging.error(f"File not found: {file_path}")
+        logger.error(f"File not found: {file_path}")
     except Exception as e:
-        logging.exception(f"An unexpected error occurred while reading {file_path}: {e}")
+        logger.exception(f"An unexpected error occurred while reading {file_path}: {e}")
     return None
 
 
@@ -49,8 +46,9 @@ def save_to_file(content):
         content (str): The text content to be saved.
 
     Returns:
-        None
+        str or None: The saved file name (e.g. "12.txt"), or None if saving fails.
     """
+    file_name = None
     try:
         os.makedirs('data', exist_ok = True)
 
@@ -66,9 +64,94 @@ def save_to_file(content):
 
         with open(file_name, "w", encoding = 'utf-8') as f:
             f.write(content)
-        logging.info(f"Content saved to {file_name}")
+        logger.info(f"Content saved to {file_name}")
+        return os.path.basename(file_name)
 
     except Exception as e:
-        logging.error(f"Failed to save file {file_name}: {e}")
-    
+        logger.error(f"Failed to save file {file_name}: {e}")
+    return None
+
+
+# --------------------------------------
+# Record Source Metadata for a Saved Page
+# --------------------------------------
+def record_source(file_name, url, title, sections, sources_path = "data/sources.json"):
+    """
+    Records where a saved page came from in a JSON sidecar keyed by file name.
+
+    Args:
+        file_name (str): Name of the saved text file (e.g. "12.txt").
+        url (str): Source URL of the page.
+        title (str): Page title.
+        sections (list): [offset, heading] pairs into the saved text.
+        sources_path (str): Path to the sources JSON file.
+
+    Returns:
+        None
+    """
+    if not file_name:
+        return
+    try:
+        sources = load_sources(sources_path)
+        sources[file_name] = {"url": url, "title": title, "sections": sections}
+
+        with open(sources_path, "w", encoding = "utf-8") as f:
+            json.dump(sources, f, ensure_ascii = False, indent = 2)
+        logger.info(f"Recorded source of {file_name}: {url}")
+
+    except Exception as e:
+        logger.error(f"Failed to record source for {file_name}: {e}")
+
+
+# ------------------------------
+# Load Source Metadata from Disk
+# ------------------------------
+def load_sources(sources_path = "data/sources.json"):
+    """
+    Loads the per-file source metadata written by `record_source`.
+
+    Args:
+        sources_path (str): Path to the sources JSON file.
+
+    Returns:
+        dict: File name -> {"url", "title", "sections"}; empty if the file doesn't exist.
+    """
+    if not os.path.exists(sources_path):
+        return {}
+    try:
+        with open(sources_path, "r", encoding = "utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load sources from {sources_path}: {e}")
+        return {}
+
+
+
+# ---------------------------
+# Report Resident Memory Usage
+# ---------------------------
+def resident_memory_mb(field = "VmRSS"):
+    """
+    Returns the current resident set size of this process in MB, read from /proc on Linux
+    and falling back to the peak RSS reported by `resource` elsewhere.
+
+    Args:
+        field (str): /proc status field to read. "VmRSS" counts memory-mapped file pages
+            that are currently cached; "RssAnon" counts only memory the process itself allocated.
+
+    Returns:
+        float: Resident memory in MB.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
 
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
@@ -1,34 +1,45 @@
 from embedding import load_embeddings, load_embedder
+from reduction import apply_reducer, load_reducer
+from snapshot import current_version, load_snapshot, publish_snapshot, schedule_gc, snapshot_root
+from utils import resident_memory_mb
+from log_config import setup_logging, query_logger
+from faiss.contrib.ondisk import merge_ondisk
 import faiss
+import json
 import logging
+import numpy as np
 import os
+import tempfile
+import threading
 
 
 # ---- Config ----
 faiss.omp_set_num_threads(1)
 folder_path = "/Users/trishika/Documents/My Projects/[1] HogRAG/embeddings"
+index_config_path = "faiss/index_config.json"
+context_window = 0  # neighbouring chunks added on each side of every hit (see ChunkStore.expand)
 
-logging.basicConfig(
-    level = logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("hograg.log"),
-        logging.StreamHandler()]
-)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 # --------------------------
 # Build and Save FAISS Index
 # --------------------------
-def build_faiss_index(embeddings, normalize = True, save_path = "faiss/faiss_index.index"):
+def build_faiss_index(embeddings, normalize = True, save_path = "faiss/faiss_index.index", config_path = index_config_path):
     """
     Builds a FAISS index from the given embeddings, optionally normalizes them for cosine similarity,
     and saves the index to disk.
 
+    If `tune_index.py` has written a configuration, the index is built from its factory string
+    and its search parameters (nprobe, efSearch) are set before saving, so they travel with
+    the index file. Otherwise a flat index is built.
+
     Args:
         embeddings (np.ndarray): A 2D numpy array of embeddings to index.
         normalize (bool): Whether to normalize embeddings for cosine similarity. Defaults to True.
         save_path (str): Path where the FAISS index will be saved.
+        config_path (str): Path to the tuned index configuration.
 
     Returns:
         faiss.Index: The built FAISS index.
@@ -40,40 +51,179 @@ def build_faiss_index(embeddings, normalize = True, save_path = "faiss/faiss_ind
         # Normalize embeddings if specified (important for cosine similarity)
         if normalize:
             faiss.normalize_L2(embeddings)
-            logging.info("Embeddings normalized for cosine similarity")
+            logger.info("Embeddings normalized for cosine similarity")
         
         # Create the directory if it doesn't exist
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
 
-        # Create a flat (brute-force) L2 distance index with dimensionality of embeddings
+        # Create the tuned index, or a flat (brute-force) L2 distance index with dimensionality of embeddings
         dim = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dim)
+        config = load_index_config(config_path, dim)
+        if config:
+            index = faiss.index_factory(dim, config["factory"])
+            if not index.is_trained:
+                index.train(embeddings)
+            logger.info("Building tuned index %s with %s", config["factory"], config["search_params"])
+        else:
+            index = faiss.IndexFlatL2(dim)
 
         # Add embeddings to index in batches to handle large datasets efficiently
         batch_size = 1000
         for i in range(0, len(embeddings), batch_size):
             index.add(embeddings[i:i+batch_size])
+
+        # Search-time parameters are serialized with the index
+        if config:
+            space = faiss.ParameterSpace()
+            for name, value in config["search_params"].items():
+                space.set_index_parameter(index, name, value)
         
         # Save the index to disk
         faiss.write_index(index, save_path)
-        logging.info(f"FAISS index built and save to: {save_path}")
+        logger.info("FAISS index built and save to: %s", save_path)
 
         return index
     
     except Exception as e:
-        logging.error(f"Failed to build FAISS index: {e}", exc_info = True)
+        logger.error("Failed to build FAISS index: %s", e, exc_info = True)
         raise  # Re-raise so caller knows something went wrong
 
 
+# ---------------------------------------
+# Build an On-Disk Index from Streamed Blocks
+# ---------------------------------------
+def build_ondisk_index(embedding_path, save_path = "faiss/faiss_index.index", nlist = None, nprobe = 16,
+                       block_size = 10000, normalize = True, config_path = index_config_path):
+    """
+    Builds an IVF index whose inverted lists live in a file next to the index
+    (`<save_path>.ivfdata`) instead of in RAM, for corpora larger than memory.
+
+    embedding.npy is memory-mapped and never loaded whole: the coarse quantizer is trained
+    on a random sample of rows, then each block of vectors is normalized, added to an empty
+    copy of the trained index and written out as a shard. The shards are merged into one
+    exactly sized lists file with `merge_ondisk`. Only the quantizer and one block are
+    resident during the build.
+
+    The index is built from the tuned factory string when there is one, so IVF-PQ and other
+    IVF variants keep their encoding. Only IVF factories can be stored this way: a tuned flat
+    or HNSW index raises ValueError and has to be built in memory with `build_faiss_index`.
+
+    Args:
+        embedding_path (str): Path to embedding.npy.
+        save_path (str): Path where the FAISS index will be saved.
+        nlist (int): Number of inverted lists for an IVF-Flat index, overriding the tuned config;
+            4 * sqrt(n) if None and no config exists.
+        nprobe (int): Lists to scan per query, unless the tuned config sets it.
+        block_size (int): Number of vectors read from disk per block.
+        normalize (bool): Whether to normalize embeddings for cosine similarity.
+        config_path (str): Path to the tuned index configuration.
+
+    Returns:
+        faiss.Index: The built index, with its lists on disk.
+    """
+    try:
+        embeddings = np.load(embedding_path, mmap_mode = "r")
+        n, dim = embeddings.shape
+        logger.info("Building on-disk index for %d vectors, resident memory %.1f MB", n, resident_memory_mb("RssAnon"))
+
+        # Use the tuned factory (e.g. IVF4096,PQ32) unless the number of lists is given explicitly
+        config = load_index_config(config_path, dim)
+        if config and nlist is None:
+            factory = config["factory"]
+        else:
+            factory = f"IVF{nlist or max(1, int(4 * np.sqrt(n)))},Flat"
+        index = faiss.index_factory(dim, factory)
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is None:
+            raise ValueError(f"On-disk indexes need an IVF factory, got {factory!r}; "
+                             "retune with an IVF candidate or build the index in memory")
+        nlist = ivf.nlist
+
+        # Train the coarse quantizer (and any codebooks) on a sample read straight from the memory map;
+        # PQ codebooks have 256 centroids each and need at least 39 points per centroid
+        rng = np.random.default_rng(0)
+        sample_ids = np.sort(rng.choice(n, size = min(n, max(64 * nlist, 39 * 256)), replace = False))
+        sample = np.array(embeddings[sample_ids], dtype = np.float32)
+        if normalize:
+            faiss.normalize_L2(sample)
+
+        index.train(sample)
+        del sample
+
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        with tempfile.TemporaryDirectory(dir = os.path.dirname(save_path)) as shard_dir:
+            shard_paths = []
+            for i in range(0, n, block_size):
+                # Copy the block out of the read-only memory map before normalizing it in place
+                block = np.array(embeddings[i:i + block_size], dtype = np.float32)
+                if normalize:
+                    faiss.normalize_L2(block)
+
+                shard = faiss.clone_index(index)
+                shard.add_with_ids(block, np.arange(i, i + len(block), dtype = np.int64))
+                shard_paths.append(os.path.join(shard_dir, f"shard_{i}.index"))
+                faiss.write_index(shard, shard_paths[-1])
+                del shard, block
+
+            # Merge the shards into lists stored in a file next to the index
+            merge_ondisk(index, shard_paths, save_path + ".ivfdata")
+
+        ivf.nprobe = nprobe
+        if config and factory == config["factory"]:
+            space = faiss.ParameterSpace()
+            for name, value in config["search_params"].items():
+                space.set_index_parameter(index, name, value)
+        faiss.write_index(index, save_path)
+        logger.info("On-disk index %s with %d lists saved to %s, resident memory %.1f MB",
+                    factory, nlist, save_path, resident_memory_mb("RssAnon"))
+
+        return index
+
+    except Exception as e:
+        logger.error("Failed to build on-disk FAISS index: %s", e, exc_info = True)
+        raise
+
+
+# ------------------------------
+# Load Tuned Index Configuration
+# ------------------------------
+def load_index_config(config_path = index_config_path, dim = None):
+    """
+    Loads the index configuration written by `tune_index.py`.
+
+    Args:
+        config_path (str): Path to the configuration JSON.
+        dim (int): Dimensionality of the vectors to index. A configuration tuned for a
+            different dimensionality (e.g. before a reducer was fitted) is ignored.
+
+    Returns:
+        dict or None: The configuration, or None if no tuning has been run or it doesn't apply.
+    """
+    if not os.path.exists(config_path):
+        return None
+    with open(config_path, "r", encoding = "utf-8") as f:
+        config = json.load(f)
+    if dim is not None and config.get("dim", dim) != dim:
+        logger.warning("Ignoring %s: tuned for %d-dimensional vectors, not %d; rerun tune_index.py",
+                       config_path, config["dim"], dim)
+        return None
+    return config
+
+
 # --------------------------
 # Load FAISS Index from File
 # --------------------------
-def load_faiss_index(index_path = "faiss/faiss_index.index"):
+def load_faiss_index(index_path = "faiss/faiss_index.index", on_disk = False):
     """
     Loads a FAISS index from a file on disk.
 
+    With `on_disk`, nothing but the index structure is read into RAM: an index built by
+    `build_ondisk_index` keeps paging its lists from the .ivfdata file next to it, and any
+    other index is memory-mapped so the OS pages it in on demand.
+
     Args:
         index_path (str): Path to the saved FAISS index file.
+        on_disk (bool): Keep the index data on disk instead of loading it.
 
     Returns:
         faiss.Index: The loaded FAISS index.
@@ -83,67 +233,381 @@ def load_faiss_index(index_path = "faiss/faiss_index.index"):
     """
     try:
         # Attempt to read the FAISS index file
-        index = faiss.read_index(index_path)
-        logging.info(f"FAISS index loaded from {index_path}")
+        index = faiss.read_index(index_path, index_io_flags(index_path, on_disk))
+        logger.info("FAISS index loaded from %s, resident memory %.1f MB", index_path, resident_memory_mb("RssAnon"))
         return index
     except Exception as e:
-        logging.info(f"Could not load FAISS index: {e}", exc_info = True)
+        logger.info("Could not load FAISS index: %s", e, exc_info = True)
         raise  # Re-raise so caller can handle missing or corrupted index
         
 
+def index_io_flags(index_path, on_disk):
+    """
+    Picks the FAISS read flags for an index file. On-disk inverted lists are opened from
+    the directory the index is in; memory-mapping them as well is not supported.
+    """
+    if not on_disk:
+        return 0
+    if os.path.exists(index_path + ".ivfdata"):
+        return faiss.IO_FLAG_ONDISK_SAME_DIR
+    return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+
+
 # --------------------------
 # Semantic Search Function
 # --------------------------
-def semantic_search(query, model, index, chunks, top_k = 5):
+def semantic_search(query, model, index, chunks, top_k = 5, filters = None, reducer = None, window = 0):
     """
     Performs a semantic similarity search to find top-k relevant chunks for a query.
 
+    When filters are given, only chunks whose metadata matches are scanned: the matching
+    chunk ids become a FAISS ID selector, and because chunks are stored in document order
+    a filter on a single page turns into a contiguous ID range.
+
     Args:
         query (str): The query string to search for.
         embedder (object): The embedding model used to vectorize the query.
         index (faiss.Index): The FAISS index containing vectorized document chunks.
-        chunks (list): List of all document chunks (each should have text data).
+        chunks (ChunkStore or list): All document chunks; indexing returns the chunk text.
         top_k (int): Number of top results to return.
+        filters (dict): Optional metadata predicates passed to `ChunkStore.filter_ids`,
+            e.g. {"title": "Philosopher's Stone", "section": "Plot"}.
+        reducer (dict): Dimensionality reducer the indexed embeddings were built with, if any;
+            the query vector is reduced with the same transform.
+        window (int): Widen each hit by this many neighbouring chunks on each side, merging
+            hits whose windows overlap (see `expand_results`).
 
     Returns:
         list of dict: Top-k context chunks most relevant to the query.
     """
     try:
-        logging.info(f"Running semantic search for: '{query}'")
-
-        logging.info(f"Index type: {type(index)}, Model: {type(model)}, Chunks: {len(chunks)}")
-
         # Embed the query into vector space
         query_vec = model.encode([query], normalize_embeddings = True).astype("float32")
-        logging.info(f"Query embedding shape: {query_vec.shape}")
-        logging.info(f"Index dimension: {index.d}")
+        if reducer is not None:
+            query_vec = apply_reducer(query_vec, reducer)
+        logger.debug("Searching %s over %d chunks (d=%d) with query vector %s, model %s",
+                     type(index).__name__, len(chunks), index.d, query_vec.shape, type(model).__name__)
 
         # Search the index for nearest neighbors to the query vector
-        D, I = index.search(query_vec, top_k)
-
-        # Collect corresponding chunks
-        results = []
-        for rank, idx in enumerate(I[0]):
-            results.append({
-                "rank": rank + 1,
-                "score": float(D[0][rank]),
-                "text": chunks[idx]
-            })
-        logging.info(f"Search for query '{query}' returned {len(results)} results")
+        if filters:
+            if not hasattr(chunks, "filter_ids"):
+                raise ValueError("Metadata filters require chunks stored as a ChunkStore")
+
+            ids = chunks.filter_ids(**filters)
+            logger.debug("Filters %s matched %d of %d chunks", filters, len(ids), len(chunks))
+            if len(ids) == 0:
+                return []
+
+            selector = build_id_selector(ids)
+            D, I = index.search(query_vec, top_k, params = build_search_params(index, selector))
+        else:
+            D, I = index.search(query_vec, top_k)
+
+        results = collect_results(D[0], I[0], chunks, window)
+        query_logger.info("Search for query %r returned %d results", query, len(results))
         return results
     except Exception as e:
-        logging.error(f"Semantic search failed: {e}")
+        logger.error("Semantic search failed: %s", e)
         return []
 
+
+def batch_semantic_search(queries, model, index, chunks, top_k = 5, reducer = None, batch_size = 64, window = 0):
+    """
+    Runs `semantic_search` for many queries at once: queries are embedded and searched
+    `batch_size` at a time, which amortizes the encoder and index overhead for offline jobs.
+
+    Args:
+        queries (list of str): The query strings.
+        model (SentenceTransformer): The query encoder.
+        index (faiss.Index): The FAISS index.
+        chunks (ChunkStore or list): All document chunks.
+        top_k (int): Number of top results per query.
+        reducer (dict): Dimensionality reducer of the indexed embeddings, if any.
+        batch_size (int): Number of queries embedded and searched together.
+        window (int): Neighbouring chunks added on each side of every hit.
+
+    Returns:
+        list of list of dict: Top-k context chunks for each query, in query order.
+    """
+    all_results = []
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        query_vecs = model.encode(batch, normalize_embeddings = True).astype("float32")
+        if reducer is not None:
+            query_vecs = apply_reducer(query_vecs, reducer)
+
+        D, I = index.search(query_vecs, top_k)
+        all_results.extend(collect_results(D[i], I[i], chunks, window) for i in range(len(batch)))
+        logger.info("Searched %d of %d queries", len(all_results), len(queries))
+    return all_results
+
+
+def collect_results(distances, ids, chunks, window = 0):
+    """
+    Turns one row of FAISS search output into result dicts with the chunk id, text and,
+    for a ChunkStore, its source metadata. Ids of -1 mark empty slots when fewer than
+    top_k chunks matched and are skipped. With a window, hits are widened by their neighbours.
+    """
+    results = []
+    for rank, idx in enumerate(ids):
+        if idx < 0:
+            continue
+        result = {
+            "rank": rank + 1,
+            "score": float(distances[rank]),
+            "id": int(idx),
+            "text": chunks[idx]
+        }
+        if hasattr(chunks, "metadata"):
+            result.update(chunks.metadata(idx))
+        results.append(result)
+
+    if window > 0 and hasattr(chunks, "expand"):
+        results = expand_results(results, chunks, window)
+    return results
+
+
+def expand_results(results, chunks, window):
+    """
+    Replaces each hit's text with a passage covering `window` neighbouring chunks on each
+    side, using the store's precomputed neighbour ids. Hits whose passages overlap or touch
+    are merged into one result that keeps the best hit's rank, score and metadata and lists
+    every hit in "hits", so the prompt gets longer coherent context without repeated text.
+
+    Args:
+        results (list of dict): Results from `collect_results`, best first.
+        chunks (ChunkStore): The store the ids refer to.
+        window (int): Number of neighbours on each side.
+
+    Returns:
+        list of dict: One result per merged passage, best first.
+    """
+    by_id = {result["id"]: result for result in results}
+    expanded = []
+    for passage in chunks.expand([result["id"] for result in results], window):
+        result = dict(by_id[passage["hits"][0]])
+        result.update(text = passage["text"], hits = passage["hits"], chunk_ids = passage["chunk_ids"])
+        expanded.append(result)
+    return expanded
+
+# --------------------------
+# Build FAISS ID Selector
+# --------------------------
+def build_id_selector(ids):
+    """
+    Turns a sorted array of chunk ids into a FAISS ID selector. A contiguous block of ids
+    (e.g. all chunks of one page) becomes a range check, anything else a hashed id batch.
+
+    Args:
+        ids (np.ndarray): Sorted int64 chunk ids.
+
+    Returns:
+        faiss.IDSelector: Selector restricting the search to the given ids.
+    """
+    if ids[-1] - ids[0] + 1 == len(ids):
+        return faiss.IDSelectorRange(int(ids[0]), int(ids[-1]) + 1)
+    return faiss.IDSelectorBatch(ids)
+
+# -----------------------------
+# Build Filtered Search Params
+# -----------------------------
+def build_search_params(index, selector):
+    """
+    Wraps an ID selector in the search parameter type the index expects. IVF and HNSW
+    indexes reject generic parameters, and their nprobe / efSearch have to be carried
+    over or the per-query parameters would reset them to defaults.
+
+    Args:
+        index (faiss.Index): The index to search.
+        selector (faiss.IDSelector): Selector restricting the search.
+
+    Returns:
+        faiss.SearchParameters: Parameters to pass to `index.search`.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel = selector, nprobe = ivf.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel = selector, efSearch = index.hnsw.efSearch)
+    return faiss.SearchParameters(sel = selector)
+
+# ------------------------------
+# Hot-Swapping Snapshot Retriever
+# ------------------------------
+class Retriever:
+    """
+    Serves semantic search from the current index snapshot and swaps to a newer snapshot
+    when CURRENT changes, without a restart.
+
+    A daemon thread polls CURRENT and preloads a new snapshot off the request path; queries
+    only read the loaded (version, index, chunks, reducer) state, which is replaced as a
+    single reference, so a query that already picked up the old state finishes against it
+    while new queries see the new one. Only one caller loads a new version at a time.
+
+    Args:
+        root (str): Root directory of the snapshot store.
+        model (SentenceTransformer): Query encoder; loaded with `load_embedder` if None.
+        check_interval (float): Seconds between checks of CURRENT by the polling thread.
+        gc_interval (float): Seconds between snapshot garbage collections, or None to disable.
+        on_disk (bool): Keep snapshot indexes on disk (see `load_faiss_index`).
+    """
+
+    def __init__(self, root = snapshot_root, model = None, check_interval = 5.0, gc_interval = None, on_disk = False):
+        self.root = root
+        self.on_disk = on_disk
+        self.model = model if model is not None else load_embedder()
+        self.check_interval = check_interval
+        self._state = None
+        self._swap_lock = threading.Lock()
+        self._gc_stop = schedule_gc(root, gc_interval) if gc_interval else None
+        self.refresh()
+        self._poll_stop = self._schedule_refresh()
+
+    @property
+    def version(self):
+        return self._state[0] if self._state else None
+
+    def current_snapshot(self):
+        """
+        Returns the snapshot being served, read as one consistent state.
+
+        Returns:
+            tuple or None: (version, index, chunks, reducer), or None if no snapshot is loaded.
+        """
+        return self._state
+
+    def refresh(self):
+        """
+        Loads the snapshot CURRENT points at if it differs from the one being served.
+
+        Returns:
+            bool: True if a new snapshot was swapped in.
+        """
+        version = current_version(self.root)
+        if version is None or version == self.version:
+            return False
+
+        # Another caller is already loading; keep serving the current snapshot
+        if not self._swap_lock.acquire(blocking = False):
+            return False
+        try:
+            if version == self.version:
+                return False
+            _, index, chunks, reducer = load_snapshot(version, self.root, on_disk = self.on_disk)
+            old_version = self.version
+            self._state = (version, index, chunks, reducer)
+            logger.info("Swapped index snapshot %s -> %s", old_version, version)
+            return True
+        except Exception as e:
+            logger.error("Failed to load snapshot %s, keeping %s: %s", version, self.version, e)
+            return False
+        finally:
+            self._swap_lock.release()
+
+    def search(self, query, top_k = 5, filters = None, window = None):
+        """
+        Runs `semantic_search` against the current snapshot.
+
+        Args:
+            query (str): The query string to search for.
+            top_k (int): Number of top results to return.
+            filters (dict): Optional metadata predicates (see `semantic_search`).
+            window (int): Neighbouring chunks added on each side of every hit; defaults to `context_window`.
+
+        Returns:
+            list of dict: Top-k context chunks most relevant to the query.
+        """
+        state = self._state
+        if state is None:
+            raise RuntimeError(f"No index snapshot published under {self.root}")
+        _, index, chunks, reducer = state
+        return semantic_search(query, self.model, index, chunks, top_k = top_k, filters = filters, reducer = reducer,
+                               window = context_window if window is None else window)
+
+    def search_batch(self, queries, top_k = 5, batch_size = 64, window = None):
+        """
+        Runs `batch_semantic_search` against the current snapshot.
+
+        Returns:
+            tuple: (version, results) where results holds the top-k chunks for each query and
+            version is the snapshot they came from.
+        """
+        self.refresh()
+        state = self._state
+        if state is None:
+            raise RuntimeError(f"No index snapshot published under {self.root}")
+        version, index, chunks, reducer = state
+        return version, batch_semantic_search(queries, self.model, index, chunks, top_k = top_k, reducer = reducer,
+                                              batch_size = batch_size,
+                                              window = context_window if window is None else window)
+
+    def close(self):
+        """
+        Stops the snapshot polling thread and the scheduled snapshot garbage collection, if any.
+        """
+        self._poll_stop.set()
+        if self._gc_stop is not None:
+            self._gc_stop.set()
+
+    def _schedule_refresh(self):
+        """
+        Runs `refresh` every `check_interval` seconds on a daemon thread.
+
+        Returns:
+            threading.Event: Set it to stop polling.
+        """
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(self.check_interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error("Snapshot refresh failed: %s", e)
+
+        threading.Thread(target = run, name = "snapshot-refresh", daemon = True).start()
+        return stop
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+def get_retriever():
+    """
+    Returns the process-wide Retriever, creating it on first use.
+    """
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = Retriever(gc_interval = 3600)
+    return _retriever
+
+
+def set_retriever(retriever):
+    """
+    Makes `retriever` the process-wide Retriever used by `retrieve_context`, e.g. one with a
+    stub encoder in a load test.
+
+    Returns:
+        Retriever or None: The Retriever it replaces.
+    """
+    global _retriever
+    with _retriever_lock:
+        previous, _retriever = _retriever, retriever
+    return previous
+
 # --------------------------
 # Retrieve Semantic Context
 # --------------------------
-def retrieve_context(user_query):
+def retrieve_context(user_query, filters = None, window = None):
     """
     Retrieves relevant context chunks for the given user query by performing semantic search.
 
     Args:
         user_query (str): The input question/query from the user.
+        filters (dict): Optional metadata predicates to scope the search (see `semantic_search`).
+        window (int): Neighbouring chunks added on each side of every hit; defaults to `context_window`.
 
     Returns:
         list of dict: List of relevant context chunks (dictionaries with at least a 'text' key).
@@ -155,25 +619,33 @@ def retrieve_context(user_query):
         # Validate user query input
         if not user_query or not user_query.strip():
             raise ValueError("User query must be a non-empty string.")
-        
-        logging.info("Loading embeddings and chunks from folder")
+
+        # Serve from the snapshot the retriever has loaded; it picks up newly published ones itself
+        retriever = get_retriever()
+        if retriever.version is not None:
+            context_chunks = retriever.search(user_query, filters = filters, window = window)
+            logger.debug("Retrieved %d relevant context chunks.", len(context_chunks))
+            return context_chunks
+
+        logger.debug("Loading embeddings and chunks from folder")
         embeddings, chunks = load_embeddings(folder_path)
 
-        logging.info("Loading FAISS index for semantic search.")
+        logger.debug("Loading FAISS index for semantic search.")
         index = load_faiss_index()
 
-        logging.info("Loading medding model.")
-        embedder = load_embedder()
+        embedder = retriever.model
 
-        logging.info("Performing semantic search for the user query.")
-        context_chunks = semantic_search(user_query, embedder, index, chunks)
+        logger.debug("Performing semantic search for the user query.")
+        reducer = load_reducer(folder_path)
+        context_chunks = semantic_search(user_query, embedder, index, chunks, filters = filters, reducer = reducer,
+                                         window = context_window if window is None else window)
 
-        logging.info(f"Retrieved {len(context_chunks)} relevant context chunks.")
+        logger.debug("Retrieved %d relevant context chunks.", len(context_chunks))
         
         return context_chunks
     
     except ValueError as ve:
-        logging.error(f"Invalid input error in retrieve_context: {ve}")
+        logger.error("Invalid input error in retrieve_context: %s", ve)
         raise
 
 if __name__ == "__main__":
@@ -181,8 +653,11 @@ if __name__ == "__main__":
     # STEP-1: Load data
     embeddings, chunks = load_embeddings(folder_path)
 
-    # STEP-2: Build index (first time only)
+    # STEP-2: Build index (first time only) and publish it as the current snapshot
     index = build_faiss_index(embeddings)
+    # Or, for corpora larger than RAM: stream embedding.npy into an index with lists on disk
+    # index = build_ondisk_index(folder_path + "/embedding.npy")
+    publish_snapshot(index, folder_path)
 
     # Or: Load existing index
     # index = load_faiss_index()
@@ -192,7 +667,7 @@ if __name__ == "__main__":
 
     # STEP-4: Query
     query = "What do we know about Harry Potter from Chapter 1?"
-    results = semantic_search(query, model, index, chunks)
+    results = semantic_search(query, model, index, chunks, reducer = load_reducer(folder_path))
 
     for result in results:
         print(f"\nRank #{result['rank']} | Score: {result['score']:.4f}")
@@ -0,0 +1,113 @@
+import argparse
+import logging
+import time
+from llm import build_prompt, load_llm
+from query_cache import QueryCache, cache_path, query_log_path, top_queries
+from snapshot import current_version, snapshot_root
+from vector_db import Retriever
+from log_config import setup_logging
+
+
+# ---- Config ----
+top_n = 200
+batch_size = 64
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------
+# Precompute Frequent Queries
+# ---------------------------------
+def warm_cache(retriever, cache, llm = None, top_n = top_n, batch_size = batch_size, max_minutes = None,
+               log_path = query_log_path, since = None):
+    """
+    Precomputes retrieval results and answers for the most frequent logged queries against
+    the snapshot the retriever serves, so the first users after a cold start or a new index
+    are answered from the cache.
+
+    Retrieval runs in batches for every query that isn't cached yet. Answers are then
+    generated one query at a time, most popular first, until the time budget runs out; the
+    job can be stopped and rerun, since cached entries are skipped. It stops early if a new
+    snapshot is published, since its results would no longer match the served index.
+
+    Args:
+        retriever (Retriever): Retriever of the snapshot to warm.
+        cache (QueryCache): Store to populate.
+        llm (GPT4All): Model for the answers, or None to precompute retrieval only.
+        top_n (int): Number of most frequent queries to warm.
+        batch_size (int): Queries embedded and searched together.
+        max_minutes (float): Time budget for generation, or None for no limit.
+        log_path (str): Path to the query log.
+        since (float): Only count queries logged after this Unix time.
+
+    Returns:
+        dict: Counts of queries, retrievals and answers computed, and the index version.
+    """
+    start = time.perf_counter()
+    queries = [query for _, _, query in top_queries(top_n, log_path, since)]
+    retriever.refresh()
+    version = retriever.version
+    stats = {"version": version, "queries": len(queries), "retrievals": 0, "answers": 0}
+    if version is None or not queries:
+        logger.warning("Nothing to warm: index version %s, %d logged queries", version, len(queries))
+        return stats
+
+    missing = [query for query in queries if cache.get_retrieval(version, query) is None]
+    if missing:
+        searched_version, results = retriever.search_batch(missing, batch_size = batch_size)
+        if searched_version != version:
+            logger.warning("Index changed from %s to %s while warming; stopping", version, searched_version)
+            return stats
+        for query, context_chunks in zip(missing, results):
+            cache.put_retrieval(version, query, context_chunks)
+        stats["retrievals"] = len(missing)
+    logger.info("Retrieval cached for %d queries (%d new) in %.1fs", len(queries), len(missing),
+                time.perf_counter() - start)
+
+    if llm is None:
+        return stats
+
+    for query in queries:
+        if max_minutes is not None and time.perf_counter() - start > max_minutes * 60:
+            logger.info("Time budget of %.0f minutes used up", max_minutes)
+            break
+        if current_version(retriever.root) != version:
+            logger.warning("A new index snapshot was published; stopping")
+            break
+        if cache.get_answer(version, query) is not None:
+            continue
+
+        context_chunks = cache.get_retrieval(version, query)
+        prompt = build_prompt([chunk["text"] for chunk in context_chunks], query)
+        cache.put_answer(version, query, llm.generate(prompt, max_tokens = 512, temp = 0.7))
+        stats["answers"] += 1
+        logger.info("Cached answer %d for %r", stats["answers"], query)
+
+    logger.info("Warmed index %s: %d retrievals and %d answers in %.1f minutes", version, stats["retrievals"],
+                stats["answers"], (time.perf_counter() - start) / 60)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Precompute retrieval and answers for frequent queries.")
+    parser.add_argument("--top", type = int, default = top_n, help = "Number of most frequent queries")
+    parser.add_argument("--batch-size", type = int, default = batch_size)
+    parser.add_argument("--max-minutes", type = float, help = "Time budget for generation")
+    parser.add_argument("--days", type = float, help = "Only count queries from the last N days")
+    parser.add_argument("--retrieval-only", action = "store_true", help = "Skip answer generation")
+    parser.add_argument("--prune", action = "store_true", help = "Delete entries of older index versions")
+    parser.add_argument("--root", default = snapshot_root)
+    parser.add_argument("--cache", default = cache_path)
+    parser.add_argument("--log", default = query_log_path)
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400 if args.days else None
+    cache = QueryCache(args.cache)
+    retriever = Retriever(args.root)
+    llm = None if args.retrieval_only else load_llm()
+
+    stats = warm_cache(retriever, cache, llm, args.top, args.batch_size, args.max_minutes, args.log, since)
+    if args.prune and stats["version"] is not None:
+        cache.prune(stats["version"])
+    cache.close()